@@ -8,7 +8,7 @@ from dotenv import load_dotenv
 
 from pipeline.chunker import Chunker
 from pipeline.knowledge_base import KnowledgeBase
-from pipeline.loader_factory import is_url
+from pipeline.loader_factory import LoaderFactory, is_url
 from pipeline.llm_service import LLMService
 from pipeline.rag_pipeline import RAGPipeline
 from pipeline.registry import DocumentRegistry
@@ -49,14 +49,15 @@ def _init_components():
 
 def cmd_ingest(pipeline: RAGPipeline, source: str) -> None:
     """Ingest a document (file path or URL)."""
-    if not is_url(source):
+    source_is_url = is_url(source)
+    if not source_is_url:
         path = Path(source)
         if not path.exists():
             print(f"Error: File not found: {source}")
             sys.exit(1)
     try:
         doc_ids = pipeline.ingest([source])
-        name = Path(source).name if not is_url(source) else source[:50]
+        name = source[:50] if source_is_url else Path(source).name
         print(f"Ingested: {name} (id: {doc_ids[0]})")
     except ValueError as e:
         print(f"Error: {e}")
@@ -66,6 +67,51 @@ def cmd_ingest(pipeline: RAGPipeline, source: str) -> None:
         sys.exit(1)
 
 
+def _expand_sources(sources: list[str]) -> list[str]:
+    """Expand directories into the supported files they contain (non-recursive)."""
+    expanded: list[str] = []
+    for source in sources:
+        if is_url(source):
+            expanded.append(source)
+            continue
+        path = Path(source)
+        if path.is_dir():
+            expanded.extend(
+                str(p)
+                for p in sorted(path.iterdir())
+                if p.is_file() and LoaderFactory.get_loader(str(p)) is not None
+            )
+        elif path.exists():
+            expanded.append(source)
+        else:
+            print(f"Error: File not found: {source}")
+            sys.exit(1)
+    return expanded
+
+
+def cmd_ingest_batch(pipeline: RAGPipeline, sources: list[str]) -> None:
+    """Ingest several files, directories, and/or URLs in one run.
+
+    Sources are loaded concurrently by the knowledge base (URL fetches overlap
+    in its thread pool) and their chunks are embedded in shared batches.
+    """
+    files = _expand_sources(sources)
+    if not files:
+        print("Error: No supported documents found.")
+        sys.exit(1)
+    try:
+        doc_ids = pipeline.ingest(files)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error during ingestion: {e}")
+        sys.exit(1)
+    for source, doc_id in zip(files, doc_ids):
+        name = source[:50] if is_url(source) else Path(source).name
+        print(f"Ingested: {name} (id: {doc_id})")
+
+
 def cmd_ask(pipeline: RAGPipeline, question: str) -> None:
     """Answer a question."""
     try:
@@ -99,7 +145,7 @@ def cmd_delete(pipeline: RAGPipeline, doc_id: str) -> None:
 def main():
     if len(sys.argv) < 2:
         print("Usage:")
-        print("  python app.py ingest <file|url>")
+        print("  python app.py ingest <file|url|dir> [<file|url|dir> ...]")
         print("  python app.py ask \"<question>\"")
         print("  python app.py list")
         print("  python app.py delete <doc_id>")
@@ -110,9 +156,13 @@ def main():
 
     if cmd == "ingest":
         if len(sys.argv) < 3:
-            print("Usage: python app.py ingest <file|url>")
+            print("Usage: python app.py ingest <file|url|dir> [<file|url|dir> ...]")
             sys.exit(1)
-        cmd_ingest(pipeline, sys.argv[2])
+        sources = sys.argv[2:]
+        if len(sources) == 1 and not Path(sources[0]).is_dir():
+            cmd_ingest(pipeline, sources[0])
+        else:
+            cmd_ingest_batch(pipeline, sources)
     elif cmd == "ask":
         if len(sys.argv) < 3:
             print("Usage: python app.py ask \"<question>\"")
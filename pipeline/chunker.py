@@ -76,7 +76,16 @@
 """Sentence-aware, citation-safe text chunker for RAG."""
 
 import re
-from typing import List
+from typing import Callable, Iterable, Iterator, List
+
+try:
+    import blingfire
+except ImportError:  # optional: fall back to the regex splitter
+    blingfire = None
+
+_PARA_RE = re.compile(r"\n\s*\n")
+# Basic sentence boundary detection
+_SENT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
 
 
 class Chunker:
@@ -96,19 +105,36 @@ class Chunker:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
 
+        # blingfire's DFA tokenizer handles abbreviations ("Dr.", "Inc.") and
+        # is much faster on long paragraphs than the backtracking regex.
+        self._sent_fn: Callable[[str], List[str]] = (
+            self._blingfire_sentences if blingfire is not None else _SENT_RE.split
+        )
+
     def chunk(self, text: str) -> List[str]:
         if not text or not text.strip():
             return []
 
-        text = text.strip()
+        return list(self.chunk_iter([text.strip()]))
+
+    def chunk_iter(self, segments: Iterable[str]) -> Iterator[str]:
+        """
+        Chunk a stream of text segments, yielding chunks as soon as they are complete.
+
+        Segments may be whole documents or single paragraphs; each is split
+        into paragraphs as it arrives, so only one chunk's worth of text needs
+        to be buffered regardless of document size.
+        """
 
         # Step 1: Split into paragraphs first
-        paragraphs = self._split_paragraphs(text)
+        paragraphs = (
+            paragraph
+            for segment in segments
+            for paragraph in self._split_paragraphs(segment)
+        )
 
         # Step 2: Merge paragraphs into size-bounded chunks
-        chunks = self._merge_paragraphs(paragraphs)
-
-        return chunks
+        return self._merge_paragraphs(paragraphs)
 
     # ---------------------------------------------------------
     # Internal helpers
@@ -118,18 +144,22 @@ class Chunker:
         """
         Split text into logical paragraphs.
         """
-        paragraphs = re.split(r"\n\s*\n", text)
+        paragraphs = _PARA_RE.split(text)
         cleaned = [p.strip() for p in paragraphs if p.strip()]
         return cleaned
 
-    def _merge_paragraphs(self, paragraphs: List[str]) -> List[str]:
+    def _merge_paragraphs(self, paragraphs: Iterable[str]) -> Iterator[str]:
         """
         Merge paragraphs into chunks without breaking words.
         Falls back to sentence splitting if a paragraph is too large.
+
+        The chunk being built is kept as a list of parts plus a running
+        length, so it is only joined once when emitted (linear, not quadratic).
         """
 
-        chunks = []
-        current = ""
+        emitted: List[str] = []
+        parts: List[str] = []
+        length = 0
 
         for paragraph in paragraphs:
 
@@ -138,33 +168,45 @@ class Chunker:
                 sentences = self._split_sentences(paragraph)
 
                 for sentence in sentences:
-                    current = self._append_with_limit(current, sentence, chunks)
-                continue
-
-            current = self._append_with_limit(current, paragraph, chunks)
+                    length = self._append_with_limit(parts, length, sentence, emitted)
+            else:
+                length = self._append_with_limit(parts, length, paragraph, emitted)
 
-        if current:
-            chunks.append(current.strip())
+            if emitted:
+                yield from emitted
+                emitted.clear()
 
-        return chunks
+        if parts:
+            yield " ".join(parts)
 
-    def _append_with_limit(self, current: str, addition: str, chunks: List[str]) -> str:
+    def _append_with_limit(
+        self,
+        parts: List[str],
+        length: int,
+        addition: str,
+        chunks: List[str],
+    ) -> int:
         """
         Append text safely while respecting chunk size.
         Ensures no mid-word splits.
+
+        `parts` (whose joined length is `length`) is updated in place;
+        returns the new joined length.
         """
 
-        candidate = f"{current} {addition}".strip() if current else addition
+        added = len(addition) + 1 if parts else len(addition)
 
-        if len(candidate) <= self.chunk_size:
-            return candidate
+        if length + added <= self.chunk_size:
+            parts.append(addition)
+            return length + added
 
         # Save current chunk
+        current = " ".join(parts)
         if current:
-            chunks.append(current.strip())
+            chunks.append(current)
 
         # Apply overlap safely
-        overlap_text = self._safe_overlap(current)
+        overlap_text = self._tail_overlap(parts)
 
         new_chunk = f"{overlap_text} {addition}".strip() if overlap_text else addition
 
@@ -175,9 +217,31 @@ class Chunker:
                 split_index = self.chunk_size
 
             chunks.append(new_chunk[:split_index].strip())
-            return new_chunk[split_index:].strip()
+            new_chunk = new_chunk[split_index:].strip()
 
-        return new_chunk
+        parts[:] = [new_chunk]
+        return len(new_chunk)
+
+    def _tail_overlap(self, parts: List[str]) -> str:
+        """
+        Overlap for the chunk held in `parts`, computed from its tail only.
+
+        Joins just enough trailing parts to cover twice the overlap window
+        (strictly longer than the window, so the result matches running
+        _safe_overlap on the whole chunk).
+        """
+
+        if not parts or self.chunk_overlap <= 0:
+            return ""
+
+        needed = 2 * self.chunk_overlap
+        start = len(parts)
+        tail_len = -1
+        while start > 0 and tail_len < needed:
+            start -= 1
+            tail_len += len(parts[start]) + 1
+
+        return self._safe_overlap(" ".join(parts[start:]))
 
     def _safe_overlap(self, text: str) -> str:
         """
@@ -206,13 +270,12 @@ class Chunker:
         Avoids breaking on common abbreviations.
         """
 
-        # Basic sentence boundary detection
-        sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', paragraph)
+        sentences = self._sent_fn(paragraph)
 
         cleaned = [s.strip() for s in sentences if s.strip()]
         return cleaned
 
-
-
-
-
+    @staticmethod
+    def _blingfire_sentences(paragraph: str) -> List[str]:
+        # One sentence per output line.
+        return blingfire.text_to_sentences(paragraph).split("\n")
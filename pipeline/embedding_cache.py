@@ -0,0 +1,73 @@
+"""Persistent chunk-embedding cache, so re-ingested text is never embedded twice."""
+
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+# Hashes per SELECT ... IN (...) query, well under SQLite's bound-parameter limit.
+_LOOKUP_BATCH = 500
+
+
+class EmbeddingCache:
+    """SQLite table of float32 embeddings keyed by a BLAKE2b digest of (model, text).
+
+    The model key is part of every digest, so switching models or backends
+    never returns vectors from another embedding space.
+    """
+
+    def __init__(self, db_path: str, model_key: str):
+        self.db_path = db_path
+        self._prefix = f"{model_key}\0".encode("utf-8")
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.executescript(
+            "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;"
+            "CREATE TABLE IF NOT EXISTS embedding_cache (hash BLOB PRIMARY KEY, vec BLOB NOT NULL) WITHOUT ROWID;"
+        )
+
+    def close(self) -> None:
+        """Close the underlying connection."""
+        with self._lock:
+            self._conn.close()
+
+    def key(self, text: str) -> bytes:
+        """Cache key of a chunk's text."""
+        return hashlib.blake2b(self._prefix + text.encode("utf-8"), digest_size=16).digest()
+
+    def get_many(self, keys: list[bytes]) -> dict[bytes, np.ndarray]:
+        """Cached vectors for whichever of the given keys are present."""
+        found: dict[bytes, np.ndarray] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM embedding_cache WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        """Store vectors (one row per key) in a single transaction."""
+        rows = [
+            (key, vec.tobytes())
+            for key, vec in zip(keys, np.asarray(vectors, dtype=np.float32))
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO embedding_cache (hash, vec) VALUES (?, ?)", rows
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
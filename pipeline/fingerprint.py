@@ -0,0 +1,27 @@
+"""Content fingerprints for local files (ingestion cache and duplicate detection)."""
+
+import functools
+import hashlib
+import os
+from typing import BinaryIO
+
+
+@functools.lru_cache(maxsize=1024)
+def _sha256(file_path: str, mtime_ns: int, size: int) -> str:
+    # mtime/size are part of the cache key so an edited file is re-hashed.
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def stream_sha256(fileobj: BinaryIO) -> str:
+    """Return the SHA-256 hex digest of an open binary file, read from the start."""
+    fileobj.seek(0)
+    digest = hashlib.file_digest(fileobj, "sha256").hexdigest()
+    fileobj.seek(0)
+    return digest
+
+
+def file_sha256(file_path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents, streamed from disk."""
+    st = os.stat(file_path)
+    return _sha256(os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
@@ -1,13 +1,22 @@
 """Knowledge base for document storage and retrieval."""
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from .chunker import Chunker
+from .fingerprint import file_sha256
 from .loader_factory import LoaderFactory, is_url
 from .loaders.url_loader import URLLoader
 from .registry import DocumentRegistry
 from .vector_store import VectorStoreManager
 
+# Upper bound on documents loaded and chunked concurrently.
+MAX_INGEST_WORKERS = 8
+
+# Chunks around each hit that are pulled in for context.
+_NEIGHBOR_OFFSETS = (-2, -1, 1, 2)
+
 
 class KnowledgeBase:
     """Manages document ingestion, storage, and retrieval."""
@@ -22,73 +31,168 @@ class KnowledgeBase:
         self.vector_store = vector_store
         self.chunker = chunker or Chunker()
 
-    def add_documents(self, files: list[str]) -> list[str]:
-        """Add documents (files or URLs) to the knowledge base. Returns list of doc_ids."""
-        doc_ids = []
+    def add_documents(self, files: list[str], max_workers: int = MAX_INGEST_WORKERS) -> list[str]:
+        """Add documents (files or URLs) to the knowledge base. Returns list of doc_ids.
+
+        Sources are validated and registered up front in a single registry
+        transaction. Documents are then loaded and chunked concurrently on up
+        to max_workers threads (URL fetches and PDF extraction are
+        independent), while the vector store buffers their chunks and embeds
+        them in shared batches.
+
+        If a document fails to load, documents before it are still stored
+        and the error is raised; it and every document after it are removed
+        from the registry again, so none is left listed without chunks.
+        """
+        doc_ids: list[str] = []
+        if not files:
+            return doc_ids
+
+        # Validate in order; sources before the first invalid one are still ingested.
+        prepared: list[tuple[str, str, str | None, str | None]] = []
+        error: Exception | None = None
         for item in files:
-            if is_url(item):
-                doc_ids.extend(self._add_url(item))
+            try:
+                prepared.append(self._prepare(item))
+            except Exception as e:
+                error = e
+                break
+
+        # Each source's position in `new`, or None if its content is already
+        # stored. Files repeated within this batch share the first copy's
+        # position, so they are registered and embedded once.
+        new: list[tuple[str, str, str | None, str | None]] = []
+        slots: list[int | None] = []
+        batch_hashes: dict[str, int] = {}
+        for p in prepared:
+            content_hash, duplicate_id = p[2], p[3]
+            if duplicate_id is not None:
+                slots.append(None)
+            elif content_hash is not None and content_hash in batch_hashes:
+                slots.append(batch_hashes[content_hash])
             else:
-                doc_ids.append(self._add_file(item))
+                if content_hash is not None:
+                    batch_hashes[content_hash] = len(new)
+                slots.append(len(new))
+                new.append(p)
+
+        registered = self.registry.register_many(
+            [source for source, _, _, _ in new],
+            [display_name for _, display_name, _, _ in new],
+            [content_hash for _, _, content_hash, _ in new],
+        )
+        jobs: list[tuple[str, str, str, bool]] = []
+        loading: set[int] = set()
+        for (source, display_name, _, duplicate_id), slot in zip(prepared, slots):
+            if slot is None:
+                jobs.append((source, display_name, duplicate_id, True))
+            else:
+                jobs.append((source, display_name, registered[slot], slot in loading))
+                loading.add(slot)
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))))
+        try:
+            # map() yields in input order, so doc_ids line up with files.
+            for doc_id, chunks, metadatas in executor.map(self._load_and_chunk, jobs):
+                self.vector_store.add(chunks, metadatas)
+                doc_ids.append(doc_id)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            try:
+                # Documents loaded before a failure are still stored.
+                self.vector_store.flush()
+            finally:
+                # Rows registered above whose chunks never reached the store.
+                stored = set(doc_ids)
+                self.registry.remove_many([i for i in registered if i not in stored])
+
+        if error is not None:
+            raise error
         return doc_ids
 
-    def _add_file(self, file_path: str) -> str:
-        """Add a local file to the knowledge base."""
-        path = Path(file_path)
+    def _prepare(self, item: str) -> tuple[str, str, str | None, str | None]:
+        """Validate one file or URL before registration.
+
+        Returns (source, display_name, content_hash, duplicate_id); duplicate_id
+        is set when a local file with identical content is already stored
+        (copies within one add_documents call are resolved by the caller).
+        """
+        if is_url(item):
+            loader = LoaderFactory.get_loader(item)
+            if not loader or not isinstance(loader, URLLoader):
+                raise ValueError("URL loader not available")
+            return item, URLLoader.get_display_name(item), None, None
+
+        path = Path(item)
         if not path.exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
-        loader = LoaderFactory.get_loader(file_path)
-        if not loader:
+            raise FileNotFoundError(f"File not found: {item}")
+        if not LoaderFactory.get_loader(item):
             raise ValueError(f"No loader registered for: {path.suffix}")
 
-        doc_id = self.registry.register(file_path, path.name)
+        content_hash = file_sha256(item)
+        return item, path.name, content_hash, self.find_duplicate(content_hash)
+
+    def _load_and_chunk(self, job: tuple[str, str, str, bool]) -> tuple[str, list[str], list[dict]]:
+        """Load and chunk one registered file or URL. Returns (doc_id, chunks, metadatas)."""
+        source, display_name, doc_id, is_duplicate = job
+        if is_duplicate:
+            return doc_id, [], []
+        if is_url(source):
+            return self._add_url(source, doc_id, display_name)
+        return self._add_file(source, doc_id, display_name)
+
+    def find_duplicate(self, content_hash: str) -> str | None:
+        """Return the doc_id of an already-stored document with identical content."""
+        existing = self.registry.find_by_hash(content_hash)
+        if existing is None:
+            return None
+        # Only trust the registry row if its chunks actually made it into the store.
+        if not self.vector_store.get_chunks_by_indices(existing["id"], [0]):
+            return None
+        return existing["id"]
+
+    def _add_file(
+        self,
+        file_path: str,
+        doc_id: str,
+        display_name: str,
+    ) -> tuple[str, list[str], list[dict]]:
+        """Load and chunk a local file. Returns (doc_id, chunks, metadatas)."""
+        loader = LoaderFactory.get_loader(file_path)
         # Store human-readable document name for citations.
         base_meta = {
             "doc_id": doc_id,
-            "file_name": path.name,
-            "document_name": path.name,
+            "file_name": display_name,
+            "document_name": display_name,
         }
 
-        if hasattr(loader, "load_pages"):
-            all_chunks: list[str] = []
-            all_metadatas: list[dict] = []
-            for page_label, page_text in loader.load_pages(file_path):
-                page_chunks = self.chunker.chunk(page_text)
-                for chunk in page_chunks:
+        all_chunks: list[str] = []
+        all_metadatas: list[dict] = []
+        # Prefer streaming pages so extraction overlaps with chunking.
+        load_pages = getattr(loader, "iter_pages", None) or getattr(loader, "load_pages", None)
+        if load_pages is not None:
+            for page_label, page_text in load_pages(file_path):
+                page = int(page_label)
+                # Keep both page and page_number for compatibility.
+                page_meta = dict(base_meta, page=page, page_number=page)
+                for chunk in self.chunker.chunk(page_text):
+                    all_metadatas.append(dict(page_meta, chunk_index=len(all_chunks)))
                     all_chunks.append(chunk)
-                    all_metadatas.append({
-                        **base_meta,
-                        "chunk_index": len(all_chunks) - 1,
-                        # Keep both page and page_number for compatibility.
-                        "page": int(page_label),
-                        "page_number": int(page_label),
-                    })
-            if all_chunks:
-                self.vector_store.add(all_chunks, all_metadatas)
         else:
-            text = loader.load(file_path)
-            chunks = self.chunker.chunk(text)
+            all_chunks = self._chunk_document(loader, file_path)
             # Treat non-paged documents as single-page for citation purposes.
-            metadatas = [
-                {
-                    **base_meta,
-                    "chunk_index": i,
-                    "page_number": 1,
-                }
-                for i in range(len(chunks))
-            ]
-            self.vector_store.add(chunks, metadatas)
-
-        return doc_id
-
-    def _add_url(self, url: str) -> list[str]:
-        """Add a URL (web page) to the knowledge base. Returns [doc_id]."""
-        loader = LoaderFactory.get_loader(url)
-        if not loader or not isinstance(loader, URLLoader):
-            raise ValueError("URL loader not available")
+            all_metadatas = self._single_page_metadatas(base_meta, len(all_chunks))
 
-        display_name = URLLoader.get_display_name(url)
-        doc_id = self.registry.register(url, display_name)
+        return doc_id, all_chunks, all_metadatas
+
+    def _add_url(
+        self,
+        url: str,
+        doc_id: str,
+        display_name: str,
+    ) -> tuple[str, list[str], list[dict]]:
+        """Load and chunk a URL (web page). Returns (doc_id, chunks, metadatas)."""
+        loader = LoaderFactory.get_loader(url)
         base_meta = {
             "doc_id": doc_id,
             "file_name": display_name,
@@ -96,67 +200,85 @@ class KnowledgeBase:
             "document_name": display_name,
         }
 
-        text = loader.load(url)
-        chunks = self.chunker.chunk(text)
+        chunks = self._chunk_document(loader, url)
         # Web pages are treated as single-page for citation purposes.
-        metadatas = [
-            {
-                **base_meta,
-                "chunk_index": i,
-                "page_number": 1,
-            }
-            for i in range(len(chunks))
-        ]
-        self.vector_store.add(chunks, metadatas)
-        return [doc_id]
+        metadatas = self._single_page_metadatas(base_meta, len(chunks))
+        return doc_id, chunks, metadatas
+
+    @staticmethod
+    def _single_page_metadatas(base_meta: dict, num_chunks: int) -> list[dict]:
+        """Per-chunk metadata for a document cited as a single page."""
+        page_meta = dict(base_meta, page_number=1)
+        return [dict(page_meta, chunk_index=i) for i in range(num_chunks)]
+
+    def _chunk_document(self, loader, source: str) -> list[str]:
+        """Chunk a non-paged document, streaming paragraphs when the loader supports it."""
+        if hasattr(loader, "iter_paragraphs"):
+            return list(self.chunker.chunk_iter(loader.iter_paragraphs(source)))
+        return self.chunker.chunk(loader.load(source))
 
     def retrieve(self, query: str, k: int = 16) -> list[dict]:
-        """Retrieve relevant chunks from the vector store, including neighbors for context."""
+        """Retrieve up to k relevant chunks from the vector store, including neighbors for context.
+
+        Each hit is followed by its neighboring chunks, so the k slots fill
+        with the best hits and their surroundings first.
+        """
         base_results = self.vector_store.search(query, k=k)
         if not base_results:
             return []
 
+        # Union the neighbor indices per document so each document is fetched once.
+        needed: dict[str, set[int]] = defaultdict(set)
+        for r in base_results:
+            meta = r.get("metadata", {}) or {}
+            doc_id = meta.get("doc_id")
+            chunk_index = meta.get("chunk_index")
+            if doc_id is not None and chunk_index is not None:
+                needed[str(doc_id)].update(
+                    int(chunk_index) + offset for offset in _NEIGHBOR_OFFSETS
+                )
+
+        # Keys are "doc_id:chunk_index" strings: one allocation, cheap to hash.
+        neighbors_by_key: dict[str, dict] = {}
+        for doc_id, indices in needed.items():
+            for n in self.vector_store.get_chunks_by_indices(doc_id, sorted(indices)):
+                n_chunk_index = (n.get("metadata", {}) or {}).get("chunk_index")
+                if n_chunk_index is not None:
+                    neighbors_by_key[f"{doc_id}:{int(n_chunk_index)}"] = n
+
         expanded: list[dict] = []
-        seen_keys: set[tuple[str, int | None]] = set()
+        seen_keys: set[str] = set()
 
         for r in base_results:
+            if len(expanded) >= k:
+                break
+
             meta = r.get("metadata", {}) or {}
             doc_id = meta.get("doc_id")
             chunk_index = meta.get("chunk_index")
 
-            # Use (doc_id, chunk_index) when available; otherwise fall back to document text.
-            key: tuple[str, int | None]
-            if doc_id is not None and chunk_index is not None:
-                key = (str(doc_id), int(chunk_index))
-            else:
-                key = (r["document"], None)
+            # If we don't have proper metadata, fall back to document text and skip neighbors.
+            if doc_id is None or chunk_index is None:
+                if r["document"] not in seen_keys:
+                    seen_keys.add(r["document"])
+                    expanded.append(r)
+                continue
 
+            doc_id_s = str(doc_id)
+            chunk_index_i = int(chunk_index)
+            key = f"{doc_id_s}:{chunk_index_i}"
             if key not in seen_keys:
                 seen_keys.add(key)
                 expanded.append(r)
 
-            # If we don't have proper metadata, we can't find neighbors.
-            if doc_id is None or chunk_index is None:
-                continue
-
-            neighbor_indices = [
-                chunk_index - 2,
-                chunk_index - 1,
-                chunk_index + 1,
-                chunk_index + 2,
-            ]
-            neighbors = self.vector_store.get_chunks_by_indices(str(doc_id), neighbor_indices)
-
-            for n in neighbors:
-                n_meta = n.get("metadata", {}) or {}
-                n_chunk_index = n_meta.get("chunk_index")
-                n_key: tuple[str, int | None]
-                if n_chunk_index is not None:
-                    n_key = (str(doc_id), int(n_chunk_index))
-                else:
-                    n_key = (n["document"], None)
-
-                if n_key not in seen_keys:
+            for offset in _NEIGHBOR_OFFSETS:
+                if len(expanded) >= k:
+                    break
+                n_key = f"{doc_id_s}:{chunk_index_i + offset}"
+                if n_key in seen_keys:
+                    continue
+                n = neighbors_by_key.get(n_key)
+                if n is not None:
                     seen_keys.add(n_key)
                     expanded.append(n)
 
@@ -169,6 +291,19 @@ class KnowledgeBase:
             self.vector_store.delete(doc_id)
         return removed
 
+    def delete_all(self) -> int:
+        """Remove every document: one registry transaction and one vector-store delete.
+
+        Returns the number of documents removed.
+        """
+        doc_ids = self.registry.remove_all()
+        self.vector_store.delete_many(doc_ids)
+        return len(doc_ids)
+
+    def corpus_fingerprint(self) -> str:
+        """Identifies the current set of documents (see DocumentRegistry.fingerprint)."""
+        return self.registry.fingerprint()
+
     def list_documents(self) -> list[dict]:
         """List all documents in the knowledge base."""
         return self.registry.list_docs()
@@ -1,32 +1,13 @@
 """LLM service using Google Gemini API."""
 
+import threading
+from collections import OrderedDict
 from collections.abc import Iterator
 
 import google.generativeai as genai
 
-
-class LLMService:
-    """Service for generating responses using Google Gemini."""
-
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self._model = genai.GenerativeModel("gemini-2.5-flash")
-
-    def _build_prompt(
-        self,
-        question: str,
-        context: str,
-        chat_history: list[dict] | None = None,
-    ) -> str:
-        """Build a strongly structured, context-aware prompt."""
-        history_block = ""
-        if chat_history:
-            history_block = "\n\nPrevious conversation:\n"
-            for msg in chat_history[-10:]:  # Last 10 turns to avoid overflow
-                role = "User" if msg.get("role") == "user" else "Assistant"
-                history_block += f"{role}: {msg.get('content', '')}\n"
-
-        return f"""You are a precise assistant that answers questions using the provided document context and conversation history when relevant.
+# Built once at import; _build_prompt only fills in the per-request fields.
+_PROMPT_TEMPLATE = """You are a precise assistant that answers questions using the provided document context and conversation history when relevant.
 
 Context from documents:
 {context}
@@ -100,6 +81,72 @@ When information is missing:
 - You may optionally add general background as (model knowledge), clearly separated from the cited content.
 """
 
+# Answers kept for repeated questions (UI retries, re-asks).
+_RESPONSE_CACHE_SIZE = 128
+
+# Most recent chat messages included in the prompt.
+HISTORY_TURNS = 10
+
+
+class LLMService:
+    """Service for generating responses using Google Gemini."""
+
+    def __init__(self, api_key: str):
+        genai.configure(api_key=api_key)
+        self._model = genai.GenerativeModel("gemini-2.5-flash")
+        self._cache: OrderedDict[tuple[str, int], str] = OrderedDict()
+        # Sessions share one service; get/move_to_end/popitem must not interleave.
+        self._cache_lock = threading.Lock()
+
+    def _cache_key(self, question: str, prompt: str) -> tuple[str, int]:
+        # The prompt already folds in context and chat history, so hashing it
+        # keeps follow-up questions with different history from colliding.
+        return question, hash(prompt)
+
+    def _cache_get(self, key: tuple[str, int]) -> str | None:
+        with self._cache_lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+        return text
+
+    def _cache_put(self, key: tuple[str, int], text: str) -> None:
+        with self._cache_lock:
+            self._cache[key] = text
+            self._cache.move_to_end(key)
+            if len(self._cache) > _RESPONSE_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def cached_answer(
+        self,
+        question: str,
+        context: str,
+        chat_history: list[dict] | None = None,
+    ) -> str | None:
+        """The complete answer cached for this prompt, if any (partial streams are never cached)."""
+        prompt = self._build_prompt(question, context, chat_history)
+        return self._cache_get(self._cache_key(question, prompt))
+
+    def _build_prompt(
+        self,
+        question: str,
+        context: str,
+        chat_history: list[dict] | None = None,
+    ) -> str:
+        """Build a strongly structured, context-aware prompt."""
+        history_block = ""
+        if chat_history:
+            history_block = "\n\nPrevious conversation:\n" + "".join(
+                f"{'User' if msg.get('role') == 'user' else 'Assistant'}: {msg.get('content', '')}\n"
+                for msg in chat_history[-HISTORY_TURNS:]  # Recent turns only, to avoid overflow
+            )
+
+        return _PROMPT_TEMPLATE.format(
+            context=context,
+            history_block=history_block,
+            question=question,
+        )
+
 
     def _extract_text_from_chunk(self, chunk) -> str:
         """Extract text from a response chunk (handles both simple and multi-part)."""
@@ -124,9 +171,19 @@ When information is missing:
     ) -> str:
         """Generate an answer given a question, retrieved context, and optional chat history."""
         prompt = self._build_prompt(question, context, chat_history)
+        key = self._cache_key(question, prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
         response = self._model.generate_content(prompt)
         text = self._extract_text_from_chunk(response)
-        return text.strip() if text else "I couldn't generate a response."
+        if not text:
+            return "I couldn't generate a response."
+
+        text = text.strip()
+        self._cache_put(key, text)
+        return text
 
     # def generate_stream(
     #     self,
@@ -157,6 +214,13 @@ When information is missing:
     ) -> Iterator[str]:
 
         prompt = self._build_prompt(question, context, chat_history)
+        key = self._cache_key(question, prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        parts: list[str] = []
 
         try:
             print("Calling LLM now...")
@@ -167,10 +231,15 @@ When information is missing:
                 try:
                     text = self._extract_text_from_chunk(chunk)
                     if text:
+                        parts.append(text)
                         yield text
                 except Exception:
                     continue
 
         except Exception:
+            # Don't cache a partial answer.
             return
 
+        if parts:
+            self._cache_put(key, "".join(parts))
+
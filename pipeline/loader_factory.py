@@ -1,6 +1,7 @@
 """Loader factory that maps file extensions and URLs to loader classes."""
 
-from pathlib import Path
+import functools
+import os
 
 from .loaders.base_loader import BaseLoader
 from .loaders.markdown_loader import MarkdownLoader
@@ -9,6 +10,7 @@ from .loaders.text_loader import TextLoader
 from .loaders.url_loader import URLLoader
 
 
+@functools.lru_cache(maxsize=4096)
 def is_url(s: str) -> bool:
     """Check if string is a valid URL."""
     s = s.strip()
@@ -23,9 +25,11 @@ class LoaderFactory:
         ".txt": TextLoader,
         ".text": TextLoader,
         ".md": MarkdownLoader,
-        ".md": MarkdownLoader,
     }
 
+    # Loaders are stateless, so one shared instance per class is enough.
+    _INSTANCE_CACHE: dict[type, BaseLoader] = {}
+
     @classmethod
     def get_loader(cls, file_path: str) -> BaseLoader | None:
         """Get the appropriate loader for a file or URL.
@@ -37,13 +41,22 @@ class LoaderFactory:
             Loader instance or None if no loader is registered.
         """
         if is_url(file_path):
-            return URLLoader()
-        ext = Path(file_path).suffix.lower()
+            return cls._instance(URLLoader)
+        # os.path.splitext avoids constructing a PurePath just for the suffix.
+        ext = os.path.splitext(file_path)[1].lower()
         loader_class = cls._EXTENSION_MAP.get(ext)
         if loader_class:
-            return loader_class()
+            return cls._instance(loader_class)
         return None
 
+    @classmethod
+    def _instance(cls, loader_class: type) -> BaseLoader:
+        """Return the shared instance of a loader class, creating it on first use."""
+        loader = cls._INSTANCE_CACHE.get(loader_class)
+        if loader is None:
+            loader = cls._INSTANCE_CACHE[loader_class] = loader_class()
+        return loader
+
     @classmethod
     def register(cls, extension: str, loader_class: type[BaseLoader]) -> None:
         """Register a new loader for an extension. Enables extensibility for formats like DOCX."""
@@ -1,6 +1,13 @@
 """Base loader abstract class for document loaders."""
 
+import mmap
+import re
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from pathlib import Path
+
+# Blank-line paragraph break, matched directly on mapped bytes.
+_PARA_BREAK = re.compile(rb"\n\s*\n")
 
 
 class BaseLoader(ABC):
@@ -17,3 +24,42 @@ class BaseLoader(ABC):
             Extracted text content as a string.
         """
         pass
+
+
+def decode_text(data) -> str:
+    """Decode UTF-8 bytes (or a buffer such as an mmap) like the text-mode reader."""
+    text = str(data, "utf-8", "replace")
+    # Match text-mode universal newline handling.
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def read_text(path: Path, mmap_threshold: int) -> str:
+    """Read a UTF-8 text file; files of at least mmap_threshold bytes are memory-mapped."""
+    if path.stat().st_size < mmap_threshold:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    # Decode straight from the mapped pages: no intermediate bytes buffer.
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return decode_text(mm)
+
+
+def iter_text_paragraphs(path: Path, mmap_threshold: int) -> Iterator[str]:
+    """Yield a UTF-8 text file as paragraph segments without decoding it in one piece.
+
+    Large files are scanned for blank-line breaks on the memory map and each
+    paragraph is decoded on its own. Breaks fall on ASCII newlines, so no
+    UTF-8 sequence is ever split. Small files are yielded whole.
+    """
+    if path.stat().st_size < mmap_threshold:
+        yield read_text(path, mmap_threshold)
+        return
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        for match in _PARA_BREAK.finditer(mm):
+            yield decode_text(mm[start:match.start()])
+            start = match.end()
+        yield decode_text(mm[start:])
@@ -1,8 +1,21 @@
 """Markdown document loader."""
 
+from collections.abc import Iterator
 from pathlib import Path
 
-from .base_loader import BaseLoader
+from .base_loader import BaseLoader, iter_text_paragraphs, read_text
+
+# Files at least this large are memory-mapped and decoded in one pass.
+_MMAP_THRESHOLD = 64 * 1024
+
+
+def load_markdown(file_path: str) -> str:
+    """Read content from a Markdown file."""
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Markdown file not found: {file_path}")
+
+    return read_text(path, _MMAP_THRESHOLD)
 
 
 class MarkdownLoader(BaseLoader):
@@ -10,9 +23,12 @@ class MarkdownLoader(BaseLoader):
 
     def load(self, file_path: str) -> str:
         """Read content from a Markdown file."""
+        return load_markdown(file_path)
+
+    def iter_paragraphs(self, file_path: str) -> Iterator[str]:
+        """Yield the file as paragraph segments without decoding it in one piece."""
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"Markdown file not found: {file_path}")
 
-        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-            return f.read()
+        yield from iter_text_paragraphs(path, _MMAP_THRESHOLD)
@@ -1,18 +1,282 @@
 
-
+import gc
+import json
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
 from pathlib import Path
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 
 import pdfplumber
+import pypdfium2 as pdfium
 
+from ..fingerprint import file_sha256
 from .base_loader import BaseLoader
 
+# Extracted pages keyed by file content hash, so unchanged PDFs are never re-parsed.
+_CACHE_DIR = Path(__file__).resolve().parents[2] / "data" / "pdf_cache"
+
+# Below this page count, pdfplumber pages are extracted serially (pool spin-up would dominate).
+_PARALLEL_MIN_PAGES = 4
+
+# One pdfplumber process pool per process, shared by every ingest thread and
+# created on first use. Spawned, not forked: by then torch and Chroma threads
+# are running, and forking a multi-threaded process can deadlock the child.
+_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+# pdfplumber caches layout objects per open document; reopen every N pages
+# so peak memory stays bounded on very large PDFs.
+_PDFPLUMBER_BATCH_PAGES = 200
+
+# PDFium is not thread-safe and the knowledge base loads documents on a thread
+# pool, so every pypdfium2 call (open, page, textpage, close) runs under this lock.
+_PDFIUM_LOCK = threading.Lock()
+
+# One pass: \r becomes \n and any run of 3+ line breaks collapses to one blank line.
+_LINE_BREAKS = re.compile(r"[\r\n]{3,}|\r")
+# Runs of horizontal whitespace this long only come from layout gaps; cap them
+# before the newline pass so it never scans megabyte-sized blank stretches.
+_LONG_WS = re.compile(r"[ \t\f\v]{256,}")
+
+
+def _use_pdfplumber() -> bool:
+    """Whether the slower pdfplumber backend was requested (USE_PDFPLUMBER=1)."""
+    return os.getenv("USE_PDFPLUMBER", "").strip().lower() in ("1", "true", "yes")
+
+
+def _line_break_repl(match: re.Match) -> str:
+    return "\n\n" if len(match.group()) >= 3 else "\n"
+
+
+def _clean_text(text: str) -> str:
+    """Minimal safe cleanup ONLY."""
+    text = _LONG_WS.sub(lambda m: m.group(0)[:255], text)
+
+    # Normalize line endings and excessive blank lines in a single linear pass
+    text = _LINE_BREAKS.sub(_line_break_repl, text)
+
+    return text.strip()
+
+
+def _pdfium_page_text(page) -> str:
+    """Extract and minimally clean the text of a pypdfium2 page. Caller holds _PDFIUM_LOCK."""
+    textpage = page.get_textpage()
+    try:
+        # get_text_range() with default arguments is deprecated in favour of this.
+        text = textpage.get_text_bounded()
+    finally:
+        textpage.close()
+
+    if not text:
+        return ""
+
+    # PDFium terminates lines with \r\n; keep a single newline per line break.
+    return _clean_text(text.replace("\r\n", "\n"))
+
+
+def _pdfplumber_page_text(page) -> str:
+    """Extract and minimally clean the text of a pdfplumber page."""
+
+    # IMPORTANT:
+    # x_tolerance helps determine when a space should exist
+    # These values work well for most research PDFs
+    text = page.extract_text(
+        x_tolerance=2,
+        y_tolerance=3,
+    )
+
+    if not text:
+        return ""
+
+    return _clean_text(text)
+
+
+def _read_cache(cache_path: Path) -> List[Tuple[int, str]] | None:
+    """Return cached (page_number, text) pairs, or None if missing/unreadable."""
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            return [(int(page), text) for page, text in json.load(f)]
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _write_cache(cache_path: Path, pages: List[Tuple[int, str]]) -> None:
+    """Write the page cache atomically; a failed write only costs a re-parse later."""
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(pages, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """
+    Extract pages [start, stop) (0-based) with pdfplumber in a worker process.
+
+    Each worker handles a contiguous slice so the PDF is opened and parsed
+    once per slice rather than once per page.
+
+    Returns:
+        List of (page_number, cleaned_text), 1-based page numbers.
+    """
+    results: List[Tuple[int, str]] = []
+    with pdfplumber.open(file_path) as pdf:
+        for idx in range(start, stop):
+            page = pdf.pages[idx]
+            try:
+                results.append((idx + 1, _pdfplumber_page_text(page)))
+            finally:
+                # Release the page's cached chars/objects and pdfminer layout
+                # now, so memory tracks one page rather than the whole slice.
+                page.close()
+    return results
+
+
+def iter_pdf_pages(file_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) per non-empty page as it is extracted.
+
+    Streaming avoids holding every page's text in memory before chunking.
+    Results are cached under data/pdf_cache by content hash and backend;
+    the cache is written once all pages have been extracted.
+    """
+
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"PDF file not found: {file_path}")
+
+    backend = "pdfplumber" if _use_pdfplumber() else "pdfium"
+    cache_path = _CACHE_DIR / f"{file_sha256(file_path)}.{backend}.json"
+    cached = _read_cache(cache_path)
+    if cached is not None:
+        yield from cached
+        return
+
+    pages: List[Tuple[int, str]] = []
+    extract = _iter_pdfplumber_pages if backend == "pdfplumber" else _iter_pdfium_pages
+    for page in extract(file_path):
+        pages.append(page)
+        yield page
+    _write_cache(cache_path, pages)
+
+
+def load_pdf_pages(file_path: str) -> List[Tuple[int, str]]:
+    """Extract (page_number, text) for every non-empty page of a PDF."""
+    return list(iter_pdf_pages(file_path))
+
+
+def _iter_pdfium_pages(file_path: str) -> Iterator[Tuple[int, str]]:
+    """
+    pypdfium2 backend (default).
+
+    The lock is taken per page and released before each yield, so concurrent
+    loads interleave page by page and a paused generator never blocks them.
+    """
+
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(file_path)
+        num_pages = len(pdf)
+    try:
+        for idx in range(num_pages):
+            with _PDFIUM_LOCK:
+                page = pdf[idx]
+                try:
+                    text = _pdfium_page_text(page)
+                finally:
+                    page.close()
+            if text:
+                yield idx + 1, text
+    finally:
+        with _PDFIUM_LOCK:
+            pdf.close()
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    """The shared pdfplumber pool, sized to the CPU count once."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _POOL
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next extraction starts a fresh one."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is pool:
+            _POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _iter_pdfplumber_pages(
+    file_path: str,
+    batch_size: int = _PDFPLUMBER_BATCH_PAGES,
+) -> Iterator[Tuple[int, str]]:
+    """
+    pdfplumber backend. Pages are extracted in parallel across processes,
+    since its layout analysis is CPU-bound and pages are independent.
+
+    Either way, no document stays open for more than batch_size pages.
+    """
+
+    workers = os.cpu_count() or 1
+
+    with pdfplumber.open(file_path) as pdf:
+        num_pages = len(pdf.pages)
+
+    if num_pages < _PARALLEL_MIN_PAGES or workers == 1:
+        for start in range(0, num_pages, batch_size):
+            for idx, text in _extract_page_range(
+                file_path, start, min(start + batch_size, num_pages)
+            ):
+                if text:
+                    yield idx, text
+            # Drop pdfminer layout caches from the batch just closed.
+            gc.collect()
+        return
+
+    workers = min(workers, num_pages)
+    # A few slices per worker keeps the pool balanced when page costs vary.
+    slice_size = min(batch_size, max(1, -(-num_pages // (workers * 4))))
+    starts = range(0, num_pages, slice_size)
+
+    pool = _process_pool()
+    try:
+        # map() yields in submission order, so pages stay sorted by index.
+        for pages in pool.map(
+            _extract_page_range,
+            repeat(file_path),
+            starts,
+            (min(start + slice_size, num_pages) for start in starts),
+        ):
+            for idx, text in pages:
+                if text:
+                    yield idx, text
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        raise
+
 
 class PDFLoader(BaseLoader):
     """
     Loader for PDF documents.
 
-    Uses pdfplumber instead of pypdf because:
+    Uses pypdfium2 (the C++ PDFium engine) by default, which extracts text
+    far faster than pure-Python parsers while keeping correct word spacing.
+
+    Set USE_PDFPLUMBER=1 to use pdfplumber instead for quality-sensitive PDFs:
     - It reconstructs spaces using glyph positioning
     - It handles academic PDFs much better
     - It avoids word-concatenation issues
@@ -20,8 +284,7 @@ class PDFLoader(BaseLoader):
 
     def load(self, file_path: str) -> str:
         """Extract full text from a PDF file."""
-        pages = self.load_pages(file_path)
-        return "\n\n".join(text for _, text in pages)
+        return "\n\n".join(text for _, text in self.iter_pages(file_path))
 
     def load_pages(self, file_path: str) -> List[Tuple[int, str]]:
         """
@@ -30,37 +293,8 @@ class PDFLoader(BaseLoader):
         Returns:
             List of (page_number, text)
         """
+        return load_pdf_pages(file_path)
 
-        path = Path(file_path)
-        if not path.exists():
-            raise FileNotFoundError(f"PDF file not found: {file_path}")
-
-        results: List[Tuple[int, str]] = []
-
-        with pdfplumber.open(file_path) as pdf:
-            for idx, page in enumerate(pdf.pages, start=1):
-
-                # IMPORTANT:
-                # x_tolerance helps determine when a space should exist
-                # These values work well for most research PDFs
-                text = page.extract_text(
-                    x_tolerance=2,
-                    y_tolerance=3,
-                )
-
-                if not text:
-                    continue
-
-                # Minimal safe cleanup ONLY
-                text = text.replace("\r", "\n")
-
-                # Normalize excessive blank lines
-                while "\n\n\n" in text:
-                    text = text.replace("\n\n\n", "\n\n")
-
-                cleaned_text = text.strip()
-
-                if cleaned_text:
-                    results.append((idx, cleaned_text))
-
-        return results
+    def iter_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) per non-empty page as it is extracted."""
+        return iter_pdf_pages(file_path)
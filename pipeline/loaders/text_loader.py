@@ -1,8 +1,21 @@
 """Plain text document loader."""
 
+from collections.abc import Iterator
 from pathlib import Path
 
-from .base_loader import BaseLoader
+from .base_loader import BaseLoader, iter_text_paragraphs, read_text
+
+# Files at least this large are memory-mapped instead of read into a buffer.
+_MMAP_THRESHOLD = 1 << 20
+
+
+def load_text(file_path: str) -> str:
+    """Read text from a plain text file."""
+    path = Path(file_path)
+    if not path.exists():
+        raise FileNotFoundError(f"Text file not found: {file_path}")
+
+    return read_text(path, _MMAP_THRESHOLD)
 
 
 class TextLoader(BaseLoader):
@@ -10,9 +23,12 @@ class TextLoader(BaseLoader):
 
     def load(self, file_path: str) -> str:
         """Read text from a plain text file."""
+        return load_text(file_path)
+
+    def iter_paragraphs(self, file_path: str) -> Iterator[str]:
+        """Yield the file as paragraph segments so large files are never decoded whole."""
         path = Path(file_path)
         if not path.exists():
             raise FileNotFoundError(f"Text file not found: {file_path}")
 
-        with open(file_path, "r", encoding="utf-8", errors="replace") as f:
-            return f.read()
+        yield from iter_text_paragraphs(path, _MMAP_THRESHOLD)
@@ -1,10 +1,48 @@
 """URL / web page loader for external knowledge base."""
 
 import re
+import threading
+from collections.abc import Iterator
 from urllib.parse import urlparse
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import trafilatura
+except ImportError:  # optional: fall back to the BeautifulSoup extraction
+    trafilatura = None
+
+# Only these subtrees are built; everything else (head, etc.) is skipped at parse time.
+_STRAINER = SoupStrainer(["main", "article", "body"])
+
+# Bodies are read in chunks and truncated past this size.
+_MAX_BODY_BYTES = 8 * 1024 * 1024
+_READ_CHUNK_BYTES = 64 * 1024
+
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# requests.Session isn't thread-safe, and ingest fetches URLs from a thread
+# pool: each thread keeps its own session, reusing keep-alive connections
+# across the URLs it fetches.
+_LOCAL = threading.local()
+
+_MAIN_CLASS_RE = re.compile(r"content|article|post|main", re.I)
+_MULTI_NL_RE = re.compile(r"\n{3,}")
+
+
+def _session() -> requests.Session:
+    """The calling thread's requests session, created on first use."""
+    session = getattr(_LOCAL, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update({"User-Agent": _USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _LOCAL.session = session
+    return session
 
 
 class URLLoader:
@@ -16,21 +54,39 @@ class URLLoader:
         if not url.startswith(("http://", "https://")):
             raise ValueError(f"Invalid URL: {url}")
 
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        response.encoding = response.apparent_encoding or "utf-8"
+        with _session().get(url, timeout=15, stream=True) as response:
+            response.raise_for_status()
+            body = self._read_body(response)
+
+        # trafilatura's boilerplate removal gives cleaner text, faster, than
+        # walking the soup; keep the soup path for pages it can't handle.
+        if trafilatura is not None:
+            text = trafilatura.extract(
+                body,
+                favor_recall=False,
+                include_comments=False,
+                include_tables=False,
+            )
+            if text:
+                return _MULTI_NL_RE.sub("\n\n", text).strip()
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        return self._extract_with_soup(body)
+
+    @staticmethod
+    def _extract_with_soup(body: bytes) -> str:
+        """Extract the main text content with BeautifulSoup."""
+        # Raw bytes let lxml detect the encoding from the BOM / <meta charset>,
+        # skipping requests' chardet pass over the whole body.
+        soup = BeautifulSoup(body, "lxml", parse_only=_STRAINER)
+        if not soup.contents:
+            soup = BeautifulSoup(body, "lxml")
 
         # Remove script, style, nav elements
         for tag in soup(["script", "style", "nav", "header", "footer", "aside"]):
             tag.decompose()
 
         # Prefer main content areas
-        main = soup.find("main") or soup.find("article") or soup.find("div", class_=re.compile(r"content|article|post|main", re.I))
+        main = soup.find("main") or soup.find("article") or soup.find("div", class_=_MAIN_CLASS_RE)
         root = main if main else soup.body or soup
 
         if not root:
@@ -38,7 +94,22 @@ class URLLoader:
 
         text = root.get_text(separator="\n", strip=True)
         # Collapse multiple newlines
-        return re.sub(r"\n{3,}", "\n\n", text).strip()
+        return _MULTI_NL_RE.sub("\n\n", text).strip()
+
+    @staticmethod
+    def _read_body(response: requests.Response) -> bytes:
+        """Read a streamed response body, stopping at _MAX_BODY_BYTES."""
+        buf = bytearray()
+        for chunk in response.iter_content(_READ_CHUNK_BYTES):
+            buf.extend(chunk)
+            if len(buf) >= _MAX_BODY_BYTES:
+                del buf[_MAX_BODY_BYTES:]
+                break
+        return bytes(buf)
+
+    def iter_paragraphs(self, url: str) -> Iterator[str]:
+        """Yield the page text for streaming chunking (a page is fetched whole)."""
+        yield self.load(url)
 
     @staticmethod
     def get_display_name(url: str) -> str:
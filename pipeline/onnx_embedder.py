@@ -0,0 +1,152 @@
+"""INT8 ONNX Runtime embedding backend, opt-in via EMBEDDING_BACKEND=onnx."""
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from huggingface_hub import hf_hub_download
+    from transformers import AutoTokenizer
+except ImportError:  # optional: VectorStoreManager keeps using SentenceTransformer
+    ort = None
+
+# Exported + quantized models, one directory per model; built once on first use.
+_EXPORT_DIR = Path(__file__).resolve().parents[1] / "data" / "onnx_models"
+_QUANTIZED_FILE = "model_quantized.onnx"
+
+# Where sentence-transformers models record their max_seq_length (256 for
+# all-MiniLM-L6-v2, below the tokenizer's own 512).
+_ST_CONFIG_FILE = "sentence_bert_config.json"
+
+
+def use_onnx() -> bool:
+    """Whether the ONNX backend was requested and its dependencies are installed."""
+    requested = os.getenv("EMBEDDING_BACKEND", "").strip().lower() == "onnx"
+    return requested and ort is not None
+
+
+def _hub_id(model_name: str) -> str:
+    # SentenceTransformer resolves bare names under sentence-transformers/.
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def _export_quantized(hub_id: str, out_dir: Path) -> None:
+    """Export the model to ONNX and dynamically quantize its weights to INT8."""
+    tmp_dir = out_dir.with_name(f"{out_dir.name}.{os.getpid()}.tmp")
+    try:
+        model = ORTModelForFeatureExtraction.from_pretrained(hub_id, export=True)
+        model.save_pretrained(tmp_dir)
+        AutoTokenizer.from_pretrained(hub_id).save_pretrained(tmp_dir)
+
+        quantizer = ORTQuantizer.from_pretrained(tmp_dir)
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+        _copy_st_config(hub_id, tmp_dir)
+
+        # Publish the finished directory in one step, so a crash mid-export
+        # never leaves a half-written model behind. os.replace cannot
+        # overwrite a non-empty directory, so clear a stale or partial one.
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp_dir, out_dir)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _copy_st_config(hub_id: str, model_dir: Path) -> None:
+    """Fetch the model's sentence-transformers config into model_dir, if it has one."""
+    try:
+        shutil.copyfile(hf_hub_download(hub_id, _ST_CONFIG_FILE), model_dir / _ST_CONFIG_FILE)
+    except OSError:
+        pass  # Not a sentence-transformers repo (or offline); the tokenizer's limit applies.
+
+
+def _max_seq_length(model_dir: Path, tokenizer) -> int:
+    """The model's sentence-transformers max_seq_length, else the tokenizer's limit."""
+    try:
+        with open(model_dir / _ST_CONFIG_FILE, encoding="utf-8") as f:
+            return int(json.load(f)["max_seq_length"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return tokenizer.model_max_length
+
+
+class OnnxEmbedder:
+    """
+    Sentence embeddings from an INT8-quantized ONNX export of a
+    sentence-transformers model (mean pooling, as MiniLM is trained with).
+
+    Implements the subset of SentenceTransformer.encode() that
+    VectorStoreManager uses, so it can stand in for the PyTorch model.
+    """
+
+    def __init__(self, model_name: str, max_seq_length: int | None = None):
+        model_dir = _EXPORT_DIR / model_name.replace("/", "__")
+        if not (model_dir / _QUANTIZED_FILE).exists():
+            model_dir.parent.mkdir(parents=True, exist_ok=True)
+            _export_quantized(_hub_id(model_name), model_dir)
+        elif not (model_dir / _ST_CONFIG_FILE).exists():
+            # Exported before the config was kept alongside the model.
+            _copy_st_config(_hub_id(model_name), model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0 lets ORT use one thread per physical core.
+        options.intra_op_num_threads = int(os.getenv("ONNX_NUM_THREADS", "0"))
+        self._session = ort.InferenceSession(
+            str(model_dir / _QUANTIZED_FILE),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        self._tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = max_seq_length or _max_seq_length(model_dir, self._tokenizer)
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        encoded = self._tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feeds = {
+            name: array.astype(np.int64)
+            for name, array in encoded.items()
+            if name in self._input_names
+        }
+        (hidden,) = self._session.run(["last_hidden_state"], feeds)
+
+        # Mean over real tokens only (padding masked out).
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        summed = (hidden * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        texts: list[str],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool | None = None,
+    ) -> np.ndarray:
+        """Embed texts as a (len(texts), dim) float32 array, in input order."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Longest first, so each batch pads to similar lengths; undone below.
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        batches = [
+            self._encode_batch([texts[i] for i in order[start:start + batch_size]])
+            for start in range(0, len(texts), batch_size)
+        ]
+        embeddings = np.concatenate(batches)[np.argsort(order)]
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.clip(norms, 1e-12, None)
+        return embeddings.astype(np.float32, copy=False)
@@ -1,8 +1,19 @@
 
 
+import asyncio
+import io
+import threading
+from collections import OrderedDict
 from collections.abc import Iterator
-from .knowledge_base import KnowledgeBase
-from .llm_service import LLMService
+from .knowledge_base import MAX_INGEST_WORKERS, KnowledgeBase
+from .llm_service import HISTORY_TURNS, LLMService
+from .semantic_cache import SemanticCache, history_fingerprint
+
+# Built contexts kept for repeated retrievals (retries, re-asked questions).
+_CONTEXT_CACHE_SIZE = 64
+
+# Fixed layout of one context block; bound once instead of re-formatting per result.
+_BLOCK_TMPL = 'Document: {}\n{}\nText: "{}"'.format
 
 
 class RAGPipeline:
@@ -14,15 +25,35 @@ class RAGPipeline:
     - Generate grounded answers
     """
 
-    def __init__(self, knowledge_base: KnowledgeBase, llm_service: LLMService):
+    def __init__(
+        self,
+        knowledge_base: KnowledgeBase,
+        llm_service: LLMService,
+        semantic_cache: SemanticCache | None = None,
+    ):
         self.knowledge_base = knowledge_base
         self.llm_service = llm_service
+        self.semantic_cache = semantic_cache
+        self._ctx_cache: OrderedDict[tuple, str] = OrderedDict()
+        # Sessions share one pipeline; get/move_to_end/popitem must not interleave.
+        self._ctx_lock = threading.Lock()
 
    
 
-    def ingest(self, files: list[str]) -> list[str]:
-        """Ingest documents into the knowledge base."""
-        return self.knowledge_base.add_documents(files)
+    def ingest(self, files: list[str], max_workers: int = MAX_INGEST_WORKERS) -> list[str]:
+        """Ingest documents into the knowledge base, loading up to max_workers at once."""
+        return self.knowledge_base.add_documents(files, max_workers=max_workers)
+
+    async def ingest_async(self, files: list[str], max_workers: int = MAX_INGEST_WORKERS) -> list[str]:
+        """
+        Ingest documents without blocking the event loop.
+
+        Loading is already concurrent inside add_documents (URL fetches run
+        on its thread pool, pdfplumber on a process pool; pypdfium2 is not
+        thread-safe, so its PDFs take turns page by page), so this only moves
+        the call off the loop thread.
+        """
+        return await asyncio.to_thread(self.knowledge_base.add_documents, files, max_workers)
 
    
     def ask(
@@ -36,14 +67,22 @@ class RAGPipeline:
         Retrieval is based ONLY on the current question.
         """
 
+        scope = self._cache_scope(chat_history)
+        if scope is not None:
+            cached = self.semantic_cache.lookup(question, *scope)
+            if cached is not None:
+                return cached
+
         results = self.knowledge_base.retrieve(question, k=k)
 
         if not results:
             return "No relevant documents found. Please ingest documents first."
 
-        context = self._build_context(results[:k])
+        context = self._build_context(results)
 
-        return self.llm_service.generate(question, context, chat_history)
+        answer = self.llm_service.generate(question, context, chat_history)
+        self._remember(question, scope, context, chat_history)
+        return answer
 
  
     def ask_stream(
@@ -57,18 +96,62 @@ class RAGPipeline:
         Preserves all formatting and spacing exactly.
         """
 
+        scope = self._cache_scope(chat_history)
+        if scope is not None:
+            cached = self.semantic_cache.lookup(question, *scope)
+            if cached is not None:
+                yield cached
+                return
+
         results = self.knowledge_base.retrieve(question, k=k)
 
         if not results:
             yield "No relevant documents found. Please ingest documents first."
             return
 
-        context = self._build_context(results[:k])
+        context = self._build_context(results)
 
         for token in self.llm_service.generate_stream(
             question, context, chat_history
         ):
             yield token
+        self._remember(question, scope, context, chat_history)
+
+    def _cache_scope(self, chat_history: list[dict] | None) -> tuple[str, str] | None:
+        """(corpus, history) fingerprints a semantic-cache entry must match, or None if disabled."""
+        if self.semantic_cache is None:
+            return None
+        history = chat_history[-HISTORY_TURNS:] if chat_history else None
+        return self.knowledge_base.corpus_fingerprint(), history_fingerprint(history)
+
+    def _remember(
+        self,
+        question: str,
+        scope: tuple[str, str] | None,
+        context: str,
+        chat_history: list[dict] | None,
+    ) -> None:
+        """Store the answer just generated in the semantic cache, if it completed."""
+        if scope is None:
+            return
+        # The LLM service only caches complete answers, never failed or partial ones.
+        answer = self.llm_service.cached_answer(question, context, chat_history)
+        if answer is not None:
+            self.semantic_cache.store(question, *scope, answer)
+
+    @staticmethod
+    def _context_key(results: list[dict]) -> tuple:
+        """Identify a result list by its chunks; chunk text is fixed per (doc_id, chunk_index)."""
+        key = []
+        for r in results:
+            meta = r.get("metadata", {}) or {}
+            doc_id = meta.get("doc_id")
+            chunk_index = meta.get("chunk_index")
+            if doc_id is None or chunk_index is None:
+                key.append(r.get("document", ""))
+            else:
+                key.append((doc_id, chunk_index))
+        return tuple(key)
 
     def _build_context(self, results: list[dict]) -> str:
         """
@@ -76,37 +159,48 @@ class RAGPipeline:
         No spacing normalization is applied.
         """
 
-        context_blocks: list[str] = []
-
-        for r in results:
-            meta = r.get("metadata", {}) or {}
-
-            document_name = (
-                meta.get("document_name")
-                or meta.get("file_name")
-                or "Unknown document"
-            )
-
-            page_number = meta.get("page_number") or meta.get("page")
-            page_start = meta.get("page_start")
-            page_end = meta.get("page_end")
-
+        key = self._context_key(results)
+        with self._ctx_lock:
+            cached = self._ctx_cache.get(key)
+            if cached is not None:
+                self._ctx_cache.move_to_end(key)
+                return cached
+
+        context = self._format_context(results)
+        with self._ctx_lock:
+            self._ctx_cache[key] = context
+            self._ctx_cache.move_to_end(key)
+            if len(self._ctx_cache) > _CONTEXT_CACHE_SIZE:
+                self._ctx_cache.popitem(last=False)
+        return context
+
+    def _format_context(self, results: list[dict]) -> str:
+        """Format retrieved results as Document/Page/Text blocks."""
+
+        # Blocks are written straight into one buffer: no block list to join.
+        buf = io.StringIO()
+        write = buf.write
+
+        for i, r in enumerate(results):
+            get = (r.get("metadata", {}) or {}).get
+
+            page_start = get("page_start")
+            page_end = get("page_end")
             if page_start is not None and page_end is not None:
                 page_line = f"Pages: {page_start}-{page_end}"
-            elif page_number is not None:
-                page_line = f"Page: {page_number}"
             else:
-                page_line = "Page: Unknown"
+                page_number = get("page_number") or get("page")
+                page_line = f"Page: {page_number}" if page_number is not None else "Page: Unknown"
 
+            if i:
+                write("\n\n")
             # IMPORTANT: do not modify retrieved text
-            text = r.get("document", "")
-
-            block = (
-                f"Document: {document_name}\n"
-                f"{page_line}\n"
-                f'Text: "{text}"'
+            write(
+                _BLOCK_TMPL(
+                    get("document_name") or get("file_name") or "Unknown document",
+                    page_line,
+                    r.get("document", ""),
+                )
             )
 
-            context_blocks.append(block)
-
-        return "\n\n".join(context_blocks)
+        return buf.getvalue()
@@ -1,7 +1,9 @@
 """Document registry using SQLite for metadata storage."""
 
+import hashlib
 import os
 import sqlite3
+import threading
 import uuid
 from pathlib import Path
 from urllib.parse import urlparse
@@ -23,58 +25,199 @@ def _display_name_for_source(source: str) -> str:
 
 
 class DocumentRegistry:
-    """SQLite-backed registry for document metadata."""
+    """SQLite-backed registry for document metadata.
+
+    Holds two long-lived connections (WAL, synchronous=NORMAL) instead of
+    reconnecting and fsyncing per call: one for writes and one for reads, each
+    guarded by its own lock. Under WAL, listing documents reads the last
+    committed state without waiting for an ingest's write transaction.
+    """
 
     def __init__(self, db_path: str = "data/documents.db"):
         self.db_path = db_path
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        # Memoized fingerprint(); writes reset it under self._lock.
+        self._fingerprint: str | None = None
+        # Autocommit mode: single statements commit themselves, multi-statement
+        # writes use explicit transactions.
+        self._conn = self._connect()
+        self._conn.execute("PRAGMA journal_mode=WAL")
         self._init_db()
+        # Opened after the schema exists; journal_mode is stored in the file.
+        self._reader = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.executescript(
+            "PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY; PRAGMA mmap_size=268435456;"
+        )
+        return conn
 
     def _init_db(self) -> None:
         """Initialize the documents table."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
+        with self._lock:
+            self._conn.execute("""
                 CREATE TABLE IF NOT EXISTS documents (
                     id TEXT PRIMARY KEY,
                     file_path TEXT NOT NULL,
                     file_name TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    content_hash TEXT
                 )
             """)
-            conn.commit()
+            # Databases created before content hashing lack the column.
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            if "content_hash" not in columns:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents (content_hash)"
+            )
+            # Lets list_docs read rows in order instead of sorting the table.
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_created_at ON documents (created_at DESC)"
+            )
+
+    def close(self) -> None:
+        """Close the underlying connections."""
+        with self._lock, self._read_lock:
+            self._conn.close()
+            self._reader.close()
 
-    def register(self, source: str, display_name: str | None = None) -> str:
+    def __enter__(self) -> "DocumentRegistry":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        for name in ("_conn", "_reader"):
+            conn = getattr(self, name, None)
+            if conn is not None:
+                conn.close()
+
+    def register(
+        self,
+        source: str,
+        display_name: str | None = None,
+        content_hash: str | None = None,
+    ) -> str:
         """Register a document (file path or URL) and return its unique ID."""
         doc_id = str(uuid.uuid4())
         file_name = display_name or _display_name_for_source(source)
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                "INSERT INTO documents (id, file_path, file_name) VALUES (?, ?, ?)",
-                (doc_id, source, file_name),
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO documents (id, file_path, file_name, content_hash) VALUES (?, ?, ?, ?)",
+                (doc_id, source, file_name, content_hash),
             )
-            conn.commit()
+            self._fingerprint = None
         return doc_id
 
+    def register_many(
+        self,
+        sources: list[str],
+        display_names: list[str | None] | None = None,
+        content_hashes: list[str | None] | None = None,
+    ) -> list[str]:
+        """Register several documents in one transaction. Returns their IDs in order."""
+        display_names = display_names or [None] * len(sources)
+        content_hashes = content_hashes or [None] * len(sources)
+        rows = [
+            (str(uuid.uuid4()), source, display_name or _display_name_for_source(source), content_hash)
+            for source, display_name, content_hash in zip(sources, display_names, content_hashes)
+        ]
+        if not rows:
+            return []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO documents (id, file_path, file_name, content_hash) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._fingerprint = None
+        return [row[0] for row in rows]
+
+    def find_by_hash(self, content_hash: str) -> dict | None:
+        """Get the earliest document registered with this content hash, if any."""
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT * FROM documents WHERE content_hash = ? ORDER BY created_at LIMIT 1",
+                (content_hash,),
+            ).fetchone()
+        return dict(row) if row else None
+
     def list_docs(self) -> list[dict]:
         """List all registered documents."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
+        with self._read_lock:
+            rows = self._reader.execute(
                 "SELECT id, file_path, file_name, created_at FROM documents ORDER BY created_at DESC"
-            )
-            return [dict(row) for row in cursor.fetchall()]
+            ).fetchall()
+        return [dict(row) for row in rows]
 
     def remove(self, doc_id: str) -> bool:
         """Remove a document from the registry. Returns True if found and removed."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
-            conn.commit()
-            return cursor.rowcount > 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+            if cursor.rowcount > 0:
+                self._fingerprint = None
+                return True
+            return False
+
+    def remove_many(self, doc_ids: list[str]) -> int:
+        """Remove several documents in one transaction. Returns how many were found."""
+        if not doc_ids:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                cursor = self._conn.executemany(
+                    "DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in doc_ids]
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._fingerprint = None
+        return cursor.rowcount
+
+    def remove_all(self) -> list[str]:
+        """Remove every document in one transaction. Returns the removed IDs."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                ids = [row[0] for row in self._conn.execute("SELECT id FROM documents")]
+                self._conn.execute("DELETE FROM documents")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._fingerprint = None
+        return ids
+
+    def fingerprint(self) -> str:
+        """Digest of the registered document IDs; changes whenever a document is added or removed.
+
+        Computed once and reused until this registry next writes, so asks do not
+        rescan the table. Writes from another process are not seen.
+        """
+        # Under the write lock, so a write cannot land between the scan and the memo.
+        with self._lock:
+            if self._fingerprint is None:
+                rows = self._conn.execute("SELECT id FROM documents ORDER BY id").fetchall()
+                self._fingerprint = hashlib.blake2b(
+                    "\n".join(row[0] for row in rows).encode("utf-8"), digest_size=16
+                ).hexdigest()
+            return self._fingerprint
 
     def get(self, doc_id: str) -> dict | None:
         """Get a document by ID."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("SELECT * FROM documents WHERE id = ?", (doc_id,))
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        with self._read_lock:
+            row = self._reader.execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return dict(row) if row else None
@@ -0,0 +1,83 @@
+"""Semantic answer cache: replays stored answers for near-duplicate questions."""
+
+import hashlib
+import uuid
+
+from .vector_store import VectorStoreManager
+
+# Minimum cosine similarity between two questions for an answer to be reused.
+SIMILARITY_THRESHOLD = 0.95
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def history_fingerprint(chat_history: list[dict] | None) -> str:
+    """Digest of the conversation turns an answer was generated with."""
+    if not chat_history:
+        return ""
+    return _digest("\x1e".join(
+        f"{msg.get('role', '')}\x1f{msg.get('content', '')}" for msg in chat_history
+    ))
+
+
+class SemanticCache:
+    """
+    Stores generated answers in their own Chroma collection, keyed by the
+    question's embedding.
+
+    An answer is replayed when a new question embeds within
+    SIMILARITY_THRESHOLD of a cached one *and* was asked against the same
+    documents (corpus fingerprint) and conversation (history fingerprint),
+    so a changed knowledge base or a follow-up never gets a stale answer.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStoreManager,
+        collection_name: str = "qa_cache",
+        threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        self.vector_store = vector_store
+        self.threshold = threshold
+        self._collection = vector_store.get_collection(collection_name)
+        # Corpus fingerprint whose entries are known to be the only ones left.
+        self._pruned_for: str | None = None
+
+    def lookup(self, question: str, corpus: str, history: str) -> str | None:
+        """Return a cached answer for a near-identical question, or None."""
+        try:
+            results = self._collection.query(
+                # Same cached embedding the retrieval step uses.
+                query_embeddings=self.vector_store.embed_query(question),
+                n_results=1,
+                where={"$and": [{"corpus": corpus}, {"history": history}]},
+                include=["documents", "distances"],
+            )
+        except Exception:
+            # A cache failure must never fail the question; fall through to the LLM.
+            return None
+        documents = results.get("documents") or [[]]
+        distances = results.get("distances") or [[]]
+        if not documents[0] or not distances[0]:
+            return None
+        # Unit vectors: distance is 1 - cosine similarity in both "ip" and "cosine" spaces.
+        if 1.0 - distances[0][0] < self.threshold:
+            return None
+        return documents[0][0]
+
+    def store(self, question: str, corpus: str, history: str, answer: str) -> None:
+        """Cache an answer; entries made against an older corpus are dropped first."""
+        try:
+            if self._pruned_for != corpus:
+                self._collection.delete(where={"corpus": {"$ne": corpus}})
+                self._pruned_for = corpus
+            self._collection.add(
+                ids=[str(uuid.uuid4())],
+                embeddings=self.vector_store.embed_query(question),
+                documents=[answer],
+                metadatas=[{"corpus": corpus, "history": history}],
+            )
+        except Exception:
+            pass
@@ -1,103 +1,975 @@
 
 
+import functools
+import os
 import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from pathlib import Path
+from typing import NamedTuple
 
 import chromadb
-from rank_bm25 import BM25Okapi
+import numpy as np
+from chromadb.errors import ChromaError
 from sentence_transformers import SentenceTransformer
 
+from .embedding_cache import EmbeddingCache
+from .onnx_embedder import OnnxEmbedder, use_onnx
+
+try:
+    import bm25s
+except ImportError:  # optional: fall back to _NumpyBM25
+    bm25s = None
+
+try:
+    import Stemmer
+except ImportError:  # optional: BM25 matches unstemmed words
+    Stemmer = None
+
+
+# Chunks per Chroma add() call; Chroma throughput peaks around 100-250 items.
+BATCH_SIZE = 200
+
+# Texts per forward pass of the embedding model.
+ENCODE_BATCH_SIZE = 64
+
+
+# Query embeddings kept per store for repeated questions.
+QUERY_CACHE_SIZE = 512
+# Rows per collection.get() page when loading the BM25 corpus.
+BM25_LOAD_PAGE_SIZE = 10_000
+# Deleted chunks are only masked out of BM25 until they exceed this share
+# of the corpus; then the corpus is compacted and the index rebuilt.
+BM25_MAX_DEAD_RATIO = 0.3
+# Up to this many chunks, embeddings are also kept in memory (rows aligned
+# with the BM25 corpus) and the vector half of search() is an exact
+# matrix-vector product instead of a Chroma HNSW query (~75 MB at 384 dims).
+EXACT_SEARCH_MAX_CHUNKS = 50_000
+
+# What Chroma raises for storage/index state rather than caller bugs: empty
+# segments (StopIteration), its own errors, hnswlib RuntimeErrors, bad
+# filters or missing collections (ValueError), inconsistent segment reads
+# (IndexError) and sqlite. Anything else propagates.
+_CHROMA_ERRORS = (StopIteration, ChromaError, RuntimeError, ValueError, IndexError, sqlite3.Error)
+
+# Embeddings are L2-normalized before they are stored (see _embed), so an
+# inner-product index ranks exactly like cosine without re-normalizing
+# vectors per comparison; the distance is 1 - dot in both spaces.
+_COLLECTION_METADATA = {"hnsw:space": "ip"}
+
+# Runs the BM25 half of search() alongside the vector query; the HNSW query
+# and the NumPy/bm25s scoring both release the GIL for most of their work.
+_SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid-search")
+
+_TOKEN_RE = re.compile(r"\w+")
+# Same matches as _TOKEN_RE on lowercased ASCII text, but a plain character
+# class is cheaper for the regex engine than Unicode \w.
+_ASCII_TOKEN_RE = re.compile(r"[a-z0-9_]+")
+
+# Lucene's English stop list (the one bm25s ships as STOPWORDS_EN).
+_STOPWORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "if", "in",
+    "into", "is", "it", "no", "not", "of", "on", "or", "such", "that", "the",
+    "their", "then", "there", "these", "they", "this", "to", "was", "will", "with",
+))
+
+# PyStemmer objects must not be shared across threads, and search() tokenizes
+# on a worker thread, so each thread builds its own (with its own word cache).
+_stemmers = threading.local()
+
+
+def _stem_words(tokens: list[str]) -> list[str]:
+    stemmer = getattr(_stemmers, "english", None)
+    if stemmer is None:
+        stemmer = _stemmers.english = Stemmer.Stemmer("english")
+    return stemmer.stemWords(tokens)
+
 
 def _tokenize(text: str) -> list[str]:
-    """Simple word tokenization for BM25."""
-    return re.findall(r"\w+", text.lower())
+    """Word tokenization for BM25: lowercase, drop stopwords, Snowball-stem."""
+    text = text.lower()
+    # isascii() is O(1): CPython records it when the string is created.
+    pattern = _ASCII_TOKEN_RE if text.isascii() else _TOKEN_RE
+    tokens = [tok for tok in pattern.findall(text) if tok not in _STOPWORDS]
+    if Stemmer is not None and tokens:
+        tokens = _stem_words(tokens)
+    return tokens
+
+
+_WHERE_OPS = {
+    "$eq": lambda value, arg: value == arg,
+    "$ne": lambda value, arg: value != arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+}
+
+
+def _where_matches(meta: dict, where: dict) -> bool:
+    """Evaluate a Chroma-style metadata filter against one chunk's metadata.
+
+    Covers plain equality, $eq/$ne/$in/$nin and $and/$or; anything else
+    raises ValueError so the caller can skip filtering instead of guessing.
+    """
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_where_matches(meta, sub) for sub in cond):
+                return False
+        elif key == "$or":
+            if not any(_where_matches(meta, sub) for sub in cond):
+                return False
+        elif isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op not in _WHERE_OPS:
+                    raise ValueError(f"Unsupported where operator: {op}")
+                if not _WHERE_OPS[op](meta.get(key), arg):
+                    return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+
+def _normalize_query(query: str) -> str:
+    """Cache key for query embeddings: case and whitespace folded.
+
+    Only the key is normalized; the query itself is embedded as given, so a
+    cased embedding model still sees the original text.
+    """
+    return " ".join(query.lower().split())
+
+
+@functools.lru_cache(maxsize=4096)
+def _tokenize_query(text: str) -> tuple[str, ...]:
+    """Cached _tokenize for queries (corpus chunks bypass the cache)."""
+    return tuple(_tokenize(text))
+
+
+# Bumped whenever _tokenize changes, so stale token caches are ignored.
+_TOKEN_CACHE_VERSION = f"1-{'stem' if Stemmer is not None else 'plain'}"
+
+
+def _read_token_cache(cache_path: Path) -> tuple[dict[str, tuple[int, int, int]], np.ndarray, list[str]] | None:
+    """Return ({chunk_id: (crc, start, stop)}, tokens, vocab) from a saved corpus, or None."""
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if str(data["version"]) != _TOKEN_CACHE_VERSION:
+                return None
+            ids = data["ids"].tolist()
+            crcs = data["crcs"].tolist()
+            offsets = data["offsets"].tolist()
+            tokens = data["tokens"]
+            vocab = data["vocab"].tolist()
+    except (OSError, ValueError, KeyError):
+        return None
+    entries = {
+        chunk_id: (crc, start, stop)
+        for chunk_id, crc, start, stop in zip(ids, crcs, offsets, offsets[1:])
+    }
+    return entries, tokens, vocab
+
+
+def _write_token_cache(
+    cache_path: Path,
+    ids: list[str],
+    crcs: list[int],
+    corpus: list[list[int]],
+    vocab: dict[str, int],
+) -> None:
+    """Write the tokenized corpus atomically; a failed write only costs re-tokenizing later."""
+    lengths = np.fromiter(map(len, corpus), dtype=np.int64, count=len(corpus))
+    offsets = np.zeros(len(corpus) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    tokens = np.fromiter(
+        (tok for doc in corpus for tok in doc), dtype=np.int32, count=int(offsets[-1])
+    )
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=np.array(_TOKEN_CACHE_VERSION),
+                ids=np.array(ids, dtype=str),
+                crcs=np.array(crcs, dtype=np.uint32),
+                offsets=offsets,
+                tokens=tokens,
+                # _vocab ids are assigned in insertion order, so the keys are the id table.
+                vocab=np.array(list(vocab), dtype=str),
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+
+
+# Reciprocal Rank Fusion damping constant (the usual 60 from Cormack et al.).
+RRF_K = 60
+
+
+@functools.lru_cache(maxsize=64)
+def _rrf_weights(n: int) -> np.ndarray:
+    """1 / (RRF_K + rank) for ranks 0..n-1; fetch_k rarely varies, so this is built once."""
+    weights = 1.0 / (RRF_K + np.arange(n))
+    weights.flags.writeable = False
+    return weights
+
+
+def _postings(corpus: list[list[int]], row_offset: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(terms, rows, tf) for each distinct (term, row) pair, sorted by term then row."""
+    num_docs = len(corpus)
+    doc_len = np.fromiter(map(len, corpus), dtype=np.int64, count=num_docs)
+    tokens = np.fromiter(
+        (tok for doc in corpus for tok in doc), dtype=np.int64, count=int(doc_len.sum())
+    )
+    rows = np.repeat(np.arange(num_docs, dtype=np.int64), doc_len)
+    pairs, tf = np.unique(tokens * max(num_docs, 1) + rows, return_counts=True)
+    terms, rows = np.divmod(pairs, max(num_docs, 1))
+    return terms, rows + row_offset, tf.astype(np.float64)
+
+
+class _NumpyBM25:
+    """
+    Incremental BM25 (Lucene variant, as bm25s scores by default) over
+    interned token ids.
+
+    Term frequencies live in term-sorted posting lists (a CSC term-document
+    matrix), so scoring a query only touches the postings of its own terms.
+    Collection statistics (document frequencies, live document count and
+    total length) are kept as counters and the BM25 weights are applied at
+    query time, so adding or removing chunks never re-reads the corpus:
+    new chunks go to a small delta segment that is merged into the main one
+    once it grows past a fraction of it.
+    """
+
+    MERGE_RATIO = 0.1
+
+    def __init__(self, corpus: list[list[int]], vocab_size: int, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._df = np.zeros(vocab_size, dtype=np.int64)
+        self._num_docs = 0
+        self._total_len = 0
+        self._count(corpus, 1)
+        self._doc_len = np.fromiter(map(len, corpus), dtype=np.int64, count=len(corpus))
+        self._main = self._segment(*_postings(corpus, 0))
+        self._delta_docs: list[list[int]] = []
+        self._delta = None
+
+    @staticmethod
+    def _segment(terms: np.ndarray, rows: np.ndarray, tf: np.ndarray) -> tuple:
+        vocab_size = int(terms[-1]) + 1 if len(terms) else 0
+        indptr = np.searchsorted(terms, np.arange(vocab_size + 1))
+        return indptr, rows, tf
+
+    def _count(self, docs: list[list[int]], sign: int) -> None:
+        """Add (sign=1) or subtract (sign=-1) documents from the collection statistics."""
+        if not docs:
+            return
+        unique_terms = [np.unique(np.asarray(doc, dtype=np.int64)) for doc in docs]
+        top = max((int(t[-1]) for t in unique_terms if len(t)), default=-1)
+        if top >= len(self._df):
+            self._df = np.pad(self._df, (0, top + 1 - len(self._df)))
+        if unique_terms:
+            np.add.at(self._df, np.concatenate(unique_terms), sign)
+        self._num_docs += sign * len(docs)
+        self._total_len += sign * sum(map(len, docs))
+
+    def add(self, docs: list[list[int]]) -> None:
+        """Append documents; they take the next row numbers."""
+        self._count(docs, 1)
+        self._doc_len = np.concatenate(
+            [self._doc_len, np.fromiter(map(len, docs), dtype=np.int64, count=len(docs))]
+        )
+        self._delta_docs.extend(docs)
+        self._delta = None
+        if len(self._delta_docs) > self.MERGE_RATIO * len(self._doc_len):
+            self._merge()
+
+    def remove(self, docs: list[list[int]]) -> None:
+        """Remove documents from the statistics; the caller masks their rows."""
+        self._count(docs, -1)
+
+    def _delta_segment(self) -> tuple:
+        if self._delta is None:
+            offset = len(self._doc_len) - len(self._delta_docs)
+            self._delta = self._segment(*_postings(self._delta_docs, offset))
+        return self._delta
+
+    def _merge(self) -> None:
+        """Fold the delta segment into the main one."""
+        indptr, rows, tf = self._main
+        d_indptr, d_rows, d_tf = self._delta_segment()
+        terms = np.concatenate([
+            np.repeat(np.arange(len(indptr) - 1), np.diff(indptr)),
+            np.repeat(np.arange(len(d_indptr) - 1), np.diff(d_indptr)),
+        ])
+        # Stable, so within a term the (older, lower) main rows stay first.
+        order = np.argsort(terms, kind="stable")
+        self._main = self._segment(
+            terms[order],
+            np.concatenate([rows, d_rows])[order],
+            np.concatenate([tf, d_tf])[order],
+        )
+        self._delta_docs = []
+        self._delta = None
+
+    def get_scores(self, query: list[int]) -> np.ndarray:
+        """BM25 score of every row for the query token ids (removed rows score as stale)."""
+        scores = np.zeros(len(self._doc_len))
+        if self._num_docs <= 0:
+            return scores
+        k1, b = self.k1, self.b
+        norm = k1 * (1 - b + b * self._doc_len / max(self._total_len / self._num_docs, 1e-9))
+        segments = [self._main] + ([self._delta_segment()] if self._delta_docs else [])
+        for tok in query:
+            if tok >= len(self._df) or self._df[tok] <= 0:
+                continue
+            df = self._df[tok]
+            idf = np.log1p((self._num_docs - df + 0.5) / (df + 0.5))
+            for indptr, rows, tf in segments:
+                if tok + 1 >= len(indptr):
+                    continue
+                start, stop = indptr[tok], indptr[tok + 1]
+                # Rows are unique within one posting list, so plain fancy-index += is safe.
+                # No (k1 + 1) numerator factor: Lucene (and bm25s) drop the constant.
+                r, f = rows[start:stop], tf[start:stop]
+                scores[r] += idf * f / (f + norm[r])
+        return scores
+
+
+class _CorpusView(NamedTuple):
+    """The resident corpus as one search() sees it, read without the store lock.
+
+    The corpus lists and the embedding buffer are only appended to past
+    their current length or replaced wholesale, so rows below num_rows never
+    change under a view; the alive mask is a copy and a built bm25s index is
+    never modified.
+    """
+
+    ids: list[str]
+    texts: list[str]
+    metas: list[dict]
+    num_rows: int
+    alive: np.ndarray | None
+    exact: bool
+    embeddings: np.ndarray | None
+    bm25: object | None
 
 
 class VectorStoreManager:
     """Manages a persistent ChromaDB collection for document embeddings."""
 
+    # Loading a model or opening a client takes seconds, so every instance
+    # shares them: models by (name, backend), clients by resolved path.
+    _MODEL_CACHE: dict[tuple[str, bool], SentenceTransformer | OnnxEmbedder] = {}
+    _CLIENT_CACHE: dict[str, chromadb.ClientAPI] = {}
+    _CACHE_LOCK = threading.Lock()
+
     def __init__(
         self,
         persist_directory: str = "vector_db",
         collection_name: str = "doc_qa",
         embedding_model: str = "all-MiniLM-L6-v2",
+        batch_size: int = BATCH_SIZE,
+        encode_batch_size: int = ENCODE_BATCH_SIZE,
     ):
         self.persist_directory = persist_directory
         self.collection_name = collection_name
         self.embedding_model_name = embedding_model
+        self.batch_size = batch_size
+        self.encode_batch_size = encode_batch_size
 
-        self._model = SentenceTransformer(embedding_model)
-        self._client = chromadb.PersistentClient(path=persist_directory)
-
-        self._collection = self._client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"},
+        self._model = self._shared_model(embedding_model)
+        # Query embeddings keyed by _normalize_query; per-instance so the cache
+        # dies with the store. Guarded because sessions share one store.
+        self._query_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self._client = self._shared_client(persist_directory)
+        # Chunk embeddings by text, so re-ingesting a document skips the model.
+        backend = "onnx" if use_onnx() else "sentence-transformers"
+        self._embedding_cache = EmbeddingCache(
+            str(Path(persist_directory) / "embedding_cache.db"),
+            model_key=f"{embedding_model}:{backend}",
         )
 
-        self._bm25: BM25Okapi | None = None
-        self._bm25_docs: list[dict] = []
-        self._rebuild_bm25()
+        self._collection = self._open_collection()
+
+        # bm25s.BM25 when bm25s is installed, else _NumpyBM25.
+        self._bm25 = None
+        # Authoritative BM25 corpus, kept in step with the collection; the
+        # BM25 index is rebuilt from it lazily when _bm25_dirty is set.
+        # Nothing is read from Chroma until the first search needs it, so
+        # startup cost no longer scales with the collection size.
+        # Stored column-wise (one list per field, row i = one chunk), with
+        # tokens interned to ints in _vocab so each distinct term is kept once.
+        self._doc_ids: list[str] = []
+        self._doc_texts: list[str] = []
+        self._doc_metas: list[dict] = []
+        self._doc_tokens: list[list[int]] = []
+        self._vocab: dict[str, int] = {}
+        # One byte per row, 0 once the chunk is deleted (tombstoned).
+        self._doc_alive = bytearray()
+        self._dead_rows = 0
+        # doc_id -> corpus rows, built on first use; see _doc_rows().
+        self._rows_by_doc_id: dict[str, list[int]] | None = None
+        # L2-normalized float32 embeddings, one per corpus row, in a buffer
+        # with spare capacity (only the first len(_doc_ids) rows are valid).
+        # Kept only while _exact_search is on; see EXACT_SEARCH_MAX_CHUNKS.
+        self._doc_emb: np.ndarray | None = None
+        self._exact_search = False
+        # Whether the corpus mirrors the whole collection (a failed page read
+        # leaves it partial); only then can chunk lookups skip Chroma.
+        self._corpus_complete = False
+        self._bm25_dirty = False
+        self._bm25_loaded = False
+
+        # Collection size as last seen, kept up to date by flush() and reset to
+        # None (unknown) by deletes; see _collection_count().
+        self._count: int | None = None
+
+        # Chunks accepted by add() but not yet embedded/written; see flush().
+        self._pending_chunks: list[str] = []
+        self._pending_metadatas: list[dict] = []
+
+        # One pipeline can be shared by every Streamlit session, so public
+        # methods that touch the buffer, corpus or tombstones hold this.
+        # Reentrant: add() flushes, add_many() adds. search() holds it only
+        # while taking a _CorpusView, not while it searches.
+        self._lock = threading.RLock()
 
     # ---------------------------------------------------------
     # Internal
     # ---------------------------------------------------------
 
-    def _embed(self, texts: list[str]) -> list[list[float]]:
-        return self._model.encode(texts).tolist()
+    @classmethod
+    def _shared_model(cls, embedding_model: str) -> SentenceTransformer | OnnxEmbedder:
+        """The process-wide embedding model for this name and backend, loaded once."""
+        key = (embedding_model, use_onnx())
+        with cls._CACHE_LOCK:
+            model = cls._MODEL_CACHE.get(key)
+            if model is None:
+                # Both expose the same encode(); see _embed().
+                if key[1]:
+                    model = OnnxEmbedder(embedding_model)
+                else:
+                    model = SentenceTransformer(embedding_model)
+                    if str(model.device).startswith("cuda"):
+                        # fp16 weights run on the tensor cores at ~2x the fp32 throughput;
+                        # cosine ranking is unaffected at this precision.
+                        model.half()
+                cls._MODEL_CACHE[key] = model
+            return model
 
-    def _rebuild_bm25(self) -> None:
-        """Rebuild BM25 index from Chroma collection."""
+    @classmethod
+    def _shared_client(cls, persist_directory: str) -> chromadb.ClientAPI:
+        """The process-wide Chroma client for this directory, opened once."""
+        key = os.path.realpath(persist_directory)
+        with cls._CACHE_LOCK:
+            client = cls._CLIENT_CACHE.get(key)
+            if client is None:
+                client = cls._CLIENT_CACHE[key] = chromadb.PersistentClient(path=persist_directory)
+            return client
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        # Chroma accepts a 2-D ndarray directly, so skip the per-float .tolist() boxing.
+        # SentenceTransformer already length-sorts texts within encode(), restores
+        # the input order on return, and picks CUDA when available.
+        embeddings = self._model.encode(
+            texts,
+            batch_size=self.encode_batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        # A half-precision model returns float16; store and search in float32.
+        return embeddings.astype(np.float32, copy=False)
+
+    def _embed_chunks(self, chunks: list[str]) -> np.ndarray:
+        """_embed for corpus chunks, reusing cached vectors and caching new ones."""
+        cache = self._embedding_cache
         try:
-            results = self._collection.get(include=["documents"])
-        except (StopIteration, Exception):
-            self._bm25 = None
-            self._bm25_docs = []
+            keys = [cache.key(chunk) for chunk in chunks]
+            hits = cache.get_many(keys)
+        except sqlite3.Error:
+            return self._embed(chunks)
+
+        missing = [i for i, key in enumerate(keys) if key not in hits]
+        if len(missing) == len(chunks):
+            embeddings = self._embed(chunks)
+        else:
+            embeddings = np.empty((len(chunks), len(next(iter(hits.values())))), dtype=np.float32)
+            for i, key in enumerate(keys):
+                if key in hits:
+                    embeddings[i] = hits[key]
+            if missing:
+                embeddings[missing] = self._embed([chunks[i] for i in missing])
+        if missing:
+            try:
+                cache.put_many([keys[i] for i in missing], embeddings[missing])
+            except sqlite3.Error:
+                pass
+        return embeddings
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Embed one query as a (1, dim) array; see _embed_query for the cached path."""
+        # Chroma wants a C-contiguous float32 2-D array; make sure it gets one
+        # here, once, rather than converting on every query/retry.
+        embedding = np.ascontiguousarray(self._embed([query]), dtype=np.float32)
+        # Cached arrays are shared between calls, so keep them read-only.
+        embedding.flags.writeable = False
+        return embedding
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        """_encode_query through an LRU keyed by the normalized query."""
+        key = _normalize_query(query)
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(key)
+            if embedding is not None:
+                self._query_cache.move_to_end(key)
+                return embedding
+
+        embedding = self._encode_query(query)
+        with self._query_cache_lock:
+            self._query_cache[key] = embedding
+            self._query_cache.move_to_end(key)
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return embedding
+
+    def _clear_bm25(self) -> None:
+        """Reset the BM25 corpus to empty."""
+        self._doc_ids = []
+        self._doc_texts = []
+        self._doc_metas = []
+        self._doc_tokens = []
+        self._vocab = {}
+        self._doc_alive = bytearray()
+        self._dead_rows = 0
+        self._rows_by_doc_id = None
+        self._doc_emb = None
+        self._exact_search = False
+        self._corpus_complete = False
+        self._bm25_dirty = True
+
+    def _intern_tokens(self, text: str) -> list[int]:
+        """Tokenize text and map each token to its _vocab id, adding new ones."""
+        vocab = self._vocab
+        return [vocab.setdefault(tok, len(vocab)) for tok in _tokenize(text)]
+
+    def _rebuild_bm25(self) -> None:
+        """Reload the BM25 corpus from the Chroma collection, one page at a time."""
+        count = self._collection_count()
+        if count is not None and count <= EXACT_SEARCH_MAX_CHUNKS:
+            if self._load_corpus(with_embeddings=True):
+                return
+            # Chroma can fail to return vectors it would still search
+            # (e.g. for re-added ids); reload text only, without exact search.
+        self._load_corpus(with_embeddings=False)
+
+    def _load_corpus(self, with_embeddings: bool) -> bool:
+        """Replace the corpus with the collection's chunks; False if a page read failed."""
+        self._clear_bm25()
+        self._bm25_loaded = True
+        include = ["documents", "metadatas"] + (["embeddings"] if with_embeddings else [])
+        embeddings: list = []
+
+        # Chunks whose id and text checksum match the saved corpus reuse its
+        # tokens; only new or changed chunks are tokenized again.
+        cache_path = self._token_cache_path()
+        cached = _read_token_cache(cache_path)
+        if cached is not None:
+            entries, cached_tokens, cached_vocab = cached
+            vocab = self._vocab
+            remap = np.array([vocab.setdefault(w, len(vocab)) for w in cached_vocab], dtype=np.int64)
+        else:
+            entries = {}
+        crcs: list[int] = []
+        reused = 0
+
+        offset = 0
+        while True:
+            try:
+                results = self._collection.get(
+                    limit=BM25_LOAD_PAGE_SIZE,
+                    offset=offset,
+                    include=include,
+                )
+            except _CHROMA_ERRORS:
+                # Partial corpus: leave exact search off, Chroma stays authoritative.
+                return False
+
+            ids_list = results.get("ids") or []
+            docs_list = results.get("documents") or []
+            metas_list = results.get("metadatas") or []
+            emb_list = results.get("embeddings") if with_embeddings else None
+            if emb_list is None:
+                emb_list = []
+
+            # zip_longest folds the per-row bounds checks into the iteration.
+            rows = zip_longest(ids_list, docs_list, metas_list, emb_list)
+            for i, (chunk_id, doc, meta, emb) in enumerate(rows, offset):
+                if doc is None:
+                    continue
+                chunk_id = chunk_id or f"chunk_{i}"
+                crc = zlib.crc32(doc.encode("utf-8"))
+                entry = entries.get(chunk_id)
+                if entry is not None and entry[0] == crc:
+                    tokens = remap[cached_tokens[entry[1]:entry[2]]].tolist()
+                    reused += 1
+                else:
+                    tokens = self._intern_tokens(doc)
+                self._doc_ids.append(chunk_id)
+                self._doc_texts.append(doc)
+                self._doc_metas.append(meta or {})
+                self._doc_tokens.append(tokens)
+                self._doc_alive.append(1)
+                crcs.append(crc)
+                if with_embeddings:
+                    embeddings.append(emb)
+
+            if len(ids_list) < BM25_LOAD_PAGE_SIZE:
+                break
+            offset += len(ids_list)
+
+        self._corpus_complete = True
+        if reused != len(self._doc_ids) or reused != len(entries):
+            _write_token_cache(cache_path, self._doc_ids, crcs, self._doc_tokens, self._vocab)
+
+        if with_embeddings and all(e is not None for e in embeddings):
+            self._exact_search = True
+            if embeddings:
+                emb = np.asarray(embeddings, dtype=np.float32)
+                # Older chunks may predate normalize_embeddings=True.
+                emb /= np.clip(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12, None)
+                self._doc_emb = emb
+        return True
+
+    def _token_cache_path(self) -> Path:
+        """Where the tokenized corpus is saved, next to the Chroma files."""
+        return Path(self.persist_directory) / f"{self.collection_name}.bm25.npz"
+
+    def _bm25_append(
+        self,
+        ids: list[str],
+        chunks: list[str],
+        metadatas: list[dict],
+        embeddings: np.ndarray,
+    ) -> None:
+        """Add newly written chunks to the BM25 corpus (tokenizing only the new ones)."""
+        if not self._bm25_loaded:
+            # The first load reads them back from Chroma anyway.
             return
+        start = len(self._doc_ids)
+        if self._exact_search:
+            self._append_embeddings(start, embeddings)
+        self._doc_ids.extend(ids)
+        self._doc_texts.extend(chunks)
+        self._doc_metas.extend(metadatas)
+        self._doc_tokens.extend(self._intern_tokens(doc) for doc in chunks)
+        self._doc_alive.extend(b"\x01" * len(chunks))
+        if self._rows_by_doc_id is not None:
+            for row, meta in enumerate(metadatas, start):
+                self._rows_by_doc_id.setdefault(meta.get("doc_id"), []).append(row)
+        if isinstance(self._bm25, _NumpyBM25) and not self._bm25_dirty:
+            # Incremental: only the new chunks are indexed.
+            self._bm25.add(self._doc_tokens[start:])
+        else:
+            self._bm25_dirty = True
 
-        ids_list = results.get("ids") or []
-        docs_list = results.get("documents") or []
-        metas_list = results.get("metadatas") or []
+    def _append_embeddings(self, start: int, embeddings: np.ndarray) -> None:
+        """Store embeddings for rows [start, start + len(embeddings)), growing the buffer."""
+        stop = start + len(embeddings)
+        if stop > EXACT_SEARCH_MAX_CHUNKS:
+            # Too big to keep resident; fall back to Chroma for vector search.
+            self._exact_search = False
+            self._doc_emb = None
+            return
+        buf = self._doc_emb
+        if buf is None or stop > len(buf):
+            # Grow geometrically so appends stay amortized O(1) per row.
+            grown = np.empty((max(stop, 2 * len(buf) if buf is not None else 0, 256), embeddings.shape[1]),
+                             dtype=np.float32)
+            if buf is not None:
+                grown[:start] = buf[:start]
+            self._doc_emb = buf = grown
+        buf[start:stop] = embeddings
 
-        self._bm25_docs = []
-        for i, doc in enumerate(docs_list):
-            if doc is None:
-                continue
-            meta = metas_list[i] if i < len(metas_list) and metas_list[i] else {}
-            self._bm25_docs.append({
-                "id": ids_list[i] if i < len(ids_list) else f"chunk_{i}",
-                "document": doc,
-                "metadata": meta,
-            })
-
-        if not self._bm25_docs:
-            self._bm25 = None
+    def _bm25_remove(self, doc_ids: tuple[str, ...]) -> int | None:
+        """Tombstone the chunks of the given documents in the BM25 corpus.
+
+        Rows stay in place (so the index stays valid) and are masked out at
+        query time; the corpus is compacted once too many rows are dead.
+        Returns how many rows were removed, or None if the corpus is not loaded.
+        """
+        if not self._bm25_loaded:
+            return None
+        rows_by_doc_id = self._doc_rows()
+        alive = self._doc_alive
+        removed_rows: list[int] = []
+        for doc_id in doc_ids:
+            for row in rows_by_doc_id.pop(doc_id, ()):
+                if alive[row]:
+                    alive[row] = 0
+                    removed_rows.append(row)
+        removed = len(removed_rows)
+        self._dead_rows += removed
+        if removed and isinstance(self._bm25, _NumpyBM25) and not self._bm25_dirty:
+            # Keep df / average length exact for the live chunks.
+            self._bm25.remove([self._doc_tokens[row] for row in removed_rows])
+        if self._dead_rows > BM25_MAX_DEAD_RATIO * len(self._doc_ids):
+            self._compact_bm25()
+            self._bm25_dirty = True
+        return removed
+
+    def _compact_bm25(self) -> None:
+        """Physically drop tombstoned rows; the index must be rebuilt afterwards."""
+        keep = [i for i, flag in enumerate(self._doc_alive) if flag]
+        self._doc_ids = [self._doc_ids[i] for i in keep]
+        self._doc_texts = [self._doc_texts[i] for i in keep]
+        self._doc_metas = [self._doc_metas[i] for i in keep]
+        self._doc_tokens = [self._doc_tokens[i] for i in keep]
+        self._doc_alive = bytearray(b"\x01" * len(keep))
+        self._dead_rows = 0
+        self._rows_by_doc_id = None
+        if self._doc_emb is not None:
+            self._doc_emb = self._doc_emb[keep]
+
+    def _doc_rows(self) -> dict[str, list[int]]:
+        """doc_id -> corpus rows, built once and then kept up to date."""
+        if self._rows_by_doc_id is None:
+            groups: dict[str, list[int]] = {}
+            for row, meta in enumerate(self._doc_metas):
+                groups.setdefault(meta.get("doc_id"), []).append(row)
+            self._rows_by_doc_id = groups
+        return self._rows_by_doc_id
+
+    def _alive_mask(self) -> np.ndarray | None:
+        """Boolean mask of live rows, or None when nothing is tombstoned."""
+        if not self._dead_rows:
+            return None
+        # Copy, so no export of the bytearray outlives this call (it must stay resizable).
+        return np.frombuffer(self._doc_alive, dtype=np.uint8).astype(bool)
+
+    def _prepare_corpus(self) -> None:
+        """Load the corpus if needed and compact it if an index rebuild is due.
+
+        search() calls this (via _ensure_bm25) under the lock, before it
+        takes the _CorpusView both halves read.
+        """
+        if not self._bm25_loaded:
+            self._rebuild_bm25()
+        if self._bm25_dirty and self._dead_rows:
+            # Rebuilding anyway, so drop the tombstoned rows for free.
+            self._compact_bm25()
+
+    def _ensure_bm25(self) -> None:
+        """Rebuild the BM25 index from the cached token lists if the corpus changed."""
+        self._prepare_corpus()
+        if not self._bm25_dirty:
             return
+        if not self._doc_tokens:
+            self._bm25 = None
+        elif bm25s is not None:
+            # NumPy backend: bm25s 0.2.0's numba retrieve ignores weight_mask, which
+            # would let deleted and filtered-out chunks through.
+            self._bm25 = bm25s.BM25(backend="numpy")
+            # Already interned: index from ids + vocab. bm25s adds its empty
+            # token to the vocab it is given, so hand it a copy.
+            self._bm25.index((self._doc_tokens, dict(self._vocab)), show_progress=False)
+        else:
+            self._bm25 = _NumpyBM25(self._doc_tokens, len(self._vocab))
+        self._bm25_dirty = False
+
+    def _corpus_view(self) -> _CorpusView:
+        """Snapshot the corpus for search(); call with the lock held, after _ensure_bm25."""
+        num_rows = len(self._doc_ids)
+        embeddings = None
+        if self._exact_search and self._doc_emb is not None:
+            embeddings = self._doc_emb[:num_rows]
+        return _CorpusView(
+            ids=self._doc_ids,
+            texts=self._doc_texts,
+            metas=self._doc_metas,
+            num_rows=num_rows,
+            alive=self._alive_mask(),
+            exact=self._exact_search,
+            embeddings=embeddings,
+            bm25=self._bm25,
+        )
+
+    def _query_token_ids(self, query: str) -> list[int]:
+        """Query terms as _vocab ids; terms outside the vocabulary cannot match any chunk."""
+        vocab = self._vocab
+        return [vocab[tok] for tok in _tokenize_query(query) if tok in vocab]
+
+    def _rows_matching(self, where: dict) -> np.ndarray | None:
+        """Sorted corpus rows whose metadata satisfies where (None = all rows).
+
+        doc_id equality / $in filters are answered from the doc_id -> rows
+        lookup; other filters are checked chunk by chunk.
+        """
+        cond = where.get("doc_id") if len(where) == 1 else None
+        if isinstance(cond, str) or (isinstance(cond, dict) and cond.keys() <= {"$eq", "$in"}):
+            if isinstance(cond, str):
+                wanted = [cond]
+            else:
+                wanted = [cond["$eq"]] if "$eq" in cond else list(cond["$in"])
+            rows_by_doc_id = self._doc_rows()
+            rows = [row for d in wanted for row in rows_by_doc_id.get(d, ())]
+            return np.unique(np.asarray(rows, dtype=np.intp))
+
+        try:
+            return np.flatnonzero([_where_matches(meta, where) for meta in self._doc_metas])
+        except (ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def _bm25_top(
+        view: _CorpusView,
+        tokenized_q: list[int],
+        n: int,
+        rows: np.ndarray | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to n (corpus index, score) pairs, best first.
+
+        If rows is given, only those corpus rows are eligible. Tombstoned
+        rows never are.
+        """
+        alive = view.alive
+        if rows is not None and alive is not None:
+            rows = rows[alive[rows]]
+        if rows is not None and not len(rows):
+            return []
 
-        tokenized = [_tokenize(d["document"]) for d in self._bm25_docs]
-        self._bm25 = BM25Okapi(tokenized)
+        if bm25s is not None:
+            weight_mask = None
+            if rows is not None:
+                weight_mask = np.zeros(view.num_rows, dtype=np.float32)
+                weight_mask[rows] = 1.0
+            elif alive is not None:
+                weight_mask = alive.astype(np.float32)
+            # Sparse-matrix scoring with top-k selection done inside bm25s.
+            indices, scores = view.bm25.retrieve(
+                [tokenized_q],
+                k=min(n, view.num_rows),
+                show_progress=False,
+                weight_mask=weight_mask,
+            )
+            return list(zip(indices[0].tolist(), scores[0].tolist()))
+
+        if rows is None and alive is not None:
+            rows = np.flatnonzero(alive)
+        scores = view.bm25.get_scores(tokenized_q)
+        if rows is not None:
+            scores = scores[rows]
+        n = min(n, len(scores))
+        if n <= 0:
+            return []
+        # O(N) selection of the top n, then sort only those n.
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[scores[top] > 0]
+        top_scores = scores[top].tolist()
+        if rows is not None:
+            top = rows[top]
+        return list(zip(top.tolist(), top_scores))
+
+    def _open_collection(self) -> chromadb.Collection:
+        """Open the collection, creating it with _COLLECTION_METADATA if it is new.
+
+        Existing collections keep the space they were built with, since
+        Chroma cannot change it in place.
+        """
+        try:
+            return self._client.get_collection(name=self.collection_name)
+        except (ValueError, ChromaError):
+            return self._client.get_or_create_collection(
+                name=self.collection_name,
+                metadata=_COLLECTION_METADATA,
+            )
 
     def _recreate_collection(self) -> None:
         """Recreate collection (workaround for Chroma StopIteration when collection has no segments)."""
         try:
             self._client.delete_collection(name=self.collection_name)
-        except Exception:
+        except _CHROMA_ERRORS:
             pass
         self._collection = self._client.get_or_create_collection(
             name=self.collection_name,
-            metadata={"hnsw:space": "cosine"},
+            metadata=_COLLECTION_METADATA,
         )
+        self._clear_bm25()
+        # The new collection is empty, so the (empty) corpus is already current.
+        self._bm25_loaded = True
+        self._exact_search = True
+        self._corpus_complete = True
+        self._count = 0
+
+    def _collection_count(self) -> int | None:
+        """Number of chunks in the collection, asking Chroma only when unknown."""
+        if self._count is None:
+            try:
+                self._count = self._collection.count()
+            except _CHROMA_ERRORS:
+                return None
+        return self._count
+
+    def _refresh_count(self) -> int | None:
+        """Re-read the collection size from Chroma, which other processes may write to.
+
+        If it no longer matches the size this process last saw, the resident
+        corpus (BM25 index, exact-search embeddings) is marked stale and is
+        reloaded from the collection on next use.
+        """
+        try:
+            count = self._collection.count()
+        except _CHROMA_ERRORS:
+            return None
+        if self._count is not None and count != self._count:
+            self._bm25_loaded = False
+            self._corpus_complete = False
+            self._exact_search = False
+        self._count = count
+        return count
+
+    def _delete_by_doc_id_prefix(self, *doc_ids: str) -> None:
+        if not doc_ids:
+            return
+        removed = self._bm25_remove(doc_ids)
+
+        # Every chunk carries its doc_id in metadata, so let Chroma filter
+        # instead of pulling the whole collection to match id prefixes.
+        where = {"doc_id": doc_ids[0]} if len(doc_ids) == 1 else {"doc_id": {"$in": list(doc_ids)}}
+        try:
+            self._collection.delete(where=where)
+        except _CHROMA_ERRORS:
+            pass
+        else:
+            # Chroma does not report how many rows it deleted; the BM25 corpus,
+            # when loaded, mirrors the collection and just removed the same rows.
+            if removed is None or self._count is None:
+                self._count = None
+            else:
+                self._count -= removed
+            return
+
+        self._count = None
 
-    def _delete_by_doc_id_prefix(self, doc_id: str) -> None:
+        # Fallback: scan ids by prefix.
+        prefixes = tuple(f"{doc_id}_" for doc_id in doc_ids)
         try:
-            # Chroma get() only accepts include=["documents","embeddings","metadatas","distances","uris","data"] - not "ids"
-            results = self._collection.get(include=["documents"])
-        except (StopIteration, Exception):
+            # ids are always returned; include=[] skips materializing documents.
+            results = self._collection.get(include=[])
+        except _CHROMA_ERRORS:
             return
         existing_ids = results.get("ids") or []
-        to_delete = [i for i in existing_ids if i.startswith(f"{doc_id}_")]
+        to_delete = [i for i in existing_ids if i.startswith(prefixes)]
         if to_delete:
             try:
                 self._collection.delete(ids=to_delete)
-            except (StopIteration, Exception):
+            except _CHROMA_ERRORS:
                 pass
 
 
@@ -110,7 +982,16 @@ class VectorStoreManager:
         chunks: list[str],
         metadata: dict | list[dict] | None = None,
     ) -> None:
-        """Add text chunks with metadata (safe against ID collisions)."""
+        """Buffer text chunks with metadata (safe against ID collisions).
+
+        A single call may carry chunks from several documents; each metadata
+        entry must then provide its own doc_id and per-document chunk_index.
+        Adding a document again replaces its earlier chunks.
+
+        Chunks are embedded and written once ``batch_size`` accumulate, or on
+        flush(). Reads and deletes flush first, so buffering is invisible to
+        callers; bulk loaders should call flush() when done.
+        """
 
         if not chunks:
             return
@@ -118,38 +999,105 @@ class VectorStoreManager:
         if isinstance(metadata, dict):
             metadatas = [{**metadata, "chunk_index": i} for i in range(len(chunks))]
         elif isinstance(metadata, list) and len(metadata) == len(chunks):
-            metadatas = [{**m, "chunk_index": i} for i, m in enumerate(metadata)]
+            metadatas = [{"chunk_index": i, **m} for i, m in enumerate(metadata)]
         else:
             metadatas = [{"chunk_index": i} for i in range(len(chunks))]
 
-        doc_id = metadatas[0].get("doc_id")
-        if not doc_id:
+        doc_ids = set(m.get("doc_id") for m in metadatas)
+        if not all(doc_ids):
             raise ValueError("doc_id is required in metadata.")
 
-        # Prevent ID collision by removing old chunks first
-        self._delete_by_doc_id_prefix(doc_id)
+        with self._lock:
+            self._drop_pending(doc_ids)
+            self._pending_chunks.extend(chunks)
+            self._pending_metadatas.extend(metadatas)
+
+            # Whole add() calls stay in one flush, so a document is never split
+            # across the delete-then-insert of two flushes.
+            if len(self._pending_chunks) >= self.batch_size:
+                self.flush()
+
+    def add_many(self, items: Iterable[tuple[list[str], dict | list[dict] | None]]) -> None:
+        """Add several (chunks, metadata) pairs, then flush."""
+        with self._lock:
+            for chunks, metadata in items:
+                self.add(chunks, metadata)
+            self.flush()
+
+    def flush(self) -> None:
+        """Embed all buffered chunks, then write them in batches of ``batch_size``.
+
+        Only the new chunks are tokenized for BM25; the index itself is
+        rebuilt on the next search. If embedding or a write fails, every
+        document not completely written goes back into the buffer (whole, so
+        the next flush replaces it cleanly) and the error propagates.
+        """
+        with self._lock:
+            if not self._pending_chunks:
+                return
+
+            chunks, metadatas = self._pending_chunks, self._pending_metadatas
+            self._pending_chunks, self._pending_metadatas = [], []
+            written = 0
+            try:
+                # Prevent ID collision by removing old chunks first
+                self._delete_by_doc_id_prefix(*dict.fromkeys(m["doc_id"] for m in metadatas))
+
+                # One encode() call for the whole buffer (its cache misses, at least):
+                # SentenceTransformer sorts its input by length before forming
+                # mini-batches, so chunks of similar length from every buffered
+                # document share a batch and padding stays low.
+                all_embeddings = self._embed_chunks(chunks)
 
-        embeddings = self._embed(chunks)
-        ids = [f"{doc_id}_{i}" for i in range(len(chunks))]
+                for start in range(0, len(chunks), self.batch_size):
+                    self._write_batch(
+                        chunks[start:start + self.batch_size],
+                        metadatas[start:start + self.batch_size],
+                        all_embeddings[start:start + self.batch_size],
+                        first=start == 0,
+                    )
+                    written = min(start + self.batch_size, len(chunks))
+            except BaseException:
+                unwritten = {m["doc_id"] for m in metadatas[written:]}
+                kept = [(c, m) for c, m in zip(chunks, metadatas) if m["doc_id"] in unwritten]
+                self._pending_chunks[:0] = [c for c, _ in kept]
+                self._pending_metadatas[:0] = [m for _, m in kept]
+                raise
 
+    def _write_batch(
+        self,
+        chunks: list[str],
+        metadatas: list[dict],
+        embeddings: np.ndarray,
+        first: bool,
+    ) -> None:
+        """Write one flush() batch to Chroma and the BM25 corpus."""
+        ids = [f"{m['doc_id']}_{m['chunk_index']}" for m in metadatas]
         try:
-            self._collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=chunks,
-                metadatas=metadatas,
-            )
+            self._collection.add(ids=ids, embeddings=embeddings, documents=chunks, metadatas=metadatas)
         except StopIteration:
-            # Chroma raises StopIteration when collection has no segments (empty/corrupt state)
+            # Chroma raises StopIteration when collection has no segments (empty/corrupt state).
+            # Recreating drops everything stored, so it is only done before this
+            # flush has written anything; later, it would wipe its own batches.
+            if not first:
+                raise RuntimeError("Chroma collection lost its segments during a flush") from None
             self._recreate_collection()
-            self._collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=chunks,
-                metadatas=metadatas,
-            )
+            self._collection.add(ids=ids, embeddings=embeddings, documents=chunks, metadatas=metadatas)
+        if self._count is not None:
+            self._count += len(ids)
+        self._bm25_append(ids, chunks, metadatas, embeddings)
 
-        self._rebuild_bm25()
+    def _drop_pending(self, doc_ids: set) -> None:
+        """Discard buffered chunks of the given documents."""
+        if not any(m["doc_id"] in doc_ids for m in self._pending_metadatas):
+            return
+        kept = [
+            (c, m)
+            for c, m in zip(self._pending_chunks, self._pending_metadatas)
+            if m["doc_id"] not in doc_ids
+        ]
+        self._pending_chunks = [c for c, _ in kept]
+        self._pending_metadatas = [m for _, m in kept]
 
     def search(
         self,
@@ -161,14 +1109,78 @@ class VectorStoreManager:
     ) -> list[dict]:
         """
         Hybrid retrieval: vector similarity + BM25, merged with Reciprocal Rank Fusion.
+
+        The BM25 side runs on a worker thread while this thread embeds the
+        query and runs the vector search, so latency is roughly the slower of
+        the two. Small collections are searched exactly in memory; larger
+        ones (or filters the in-memory matcher cannot evaluate) go to Chroma.
+        If the query cannot be embedded, the BM25 results are returned alone.
+
+        The lock is held only to bring the corpus and index up to date and
+        take a _CorpusView; embedding and both searches run without it, so
+        searches from different sessions overlap.
         """
-        query_embedding = self._embed([query])
+        bm25_results: list[dict] | None = None
+        with self._lock:
+            self.flush()
+            # Read live, not from _count: the CLI or another process may have
+            # written since, and a stale 0 would hide every later document.
+            if self._refresh_count() == 0:
+                # Nothing to find; skip the model forward pass entirely.
+                return []
+            self._ensure_bm25()
+            rows = self._rows_matching(where) if where else None
+            view = self._corpus_view()
+            tokenized_q = self._query_token_ids(query)
+            if isinstance(view.bm25, _NumpyBM25):
+                # Later writes update this index in place; score it while locked.
+                bm25_results = self._run_bm25(view, tokenized_q, fetch_k, rows)
 
-        # ----- 1. Vector search -----
+        bm25_future = None
+        if bm25_results is None:
+            bm25_future = _SEARCH_EXECUTOR.submit(self._run_bm25, view, tokenized_q, fetch_k, rows)
         try:
-            total_points = self._collection.count()
-        except Exception:
-            total_points = None
+            try:
+                query_embedding = self._embed_query(query)
+            except RuntimeError:
+                # torch (e.g. CUDA out of memory) and onnxruntime both raise
+                # RuntimeError subclasses; keyword results are better than none.
+                vector_results = []
+            else:
+                vector_results = self._vector_search(
+                    view, query_embedding, fetch_k, distance_threshold, where, rows
+                )
+        finally:
+            if bm25_future is not None:
+                # Always wait, so a failed vector search never leaves BM25 running.
+                bm25_results = bm25_future.result()
+
+        # ----- Reciprocal Rank Fusion -----
+        return self._fuse(vector_results, bm25_results, k)
+
+    def _vector_search(
+        self,
+        view: _CorpusView,
+        query_embedding: np.ndarray,
+        fetch_k: int,
+        distance_threshold: float | None,
+        where: dict | None,
+        rows: np.ndarray | None,
+    ) -> list[dict]:
+        """Vector half of search(): exact in memory when possible, else Chroma."""
+        if view.exact and (where is None or rows is not None):
+            return self._run_vector_exact(view, query_embedding, fetch_k, distance_threshold, rows)
+        return self._run_vector(query_embedding, fetch_k, distance_threshold, where)
+
+    def _run_vector(
+        self,
+        query_embedding: np.ndarray,
+        fetch_k: int,
+        distance_threshold: float | None,
+        where: dict | None,
+    ) -> list[dict]:
+        """Vector half of search(): nearest chunks from Chroma."""
+        total_points = self._collection_count()
 
         n_results = fetch_k
         if total_points:
@@ -185,7 +1197,7 @@ class VectorStoreManager:
                         where=where,
                     )
                     break
-                except Exception as e:
+                except _CHROMA_ERRORS as e:
                     msg = str(e).lower()
                     if (
                         ("contiguous 2d array" in msg or "contigious 2d array" in msg)
@@ -201,62 +1213,140 @@ class VectorStoreManager:
                     dist = results["distances"][0][i] if results["distances"] else 0.0
                     if distance_threshold is None or dist <= distance_threshold:
                         vector_results.append({
+                            "id": results["ids"][0][i],
                             "document": doc,
                             "metadata": meta,
                             "distance": dist,
                         })
-        except Exception:
+        except _CHROMA_ERRORS:
             pass
+        return vector_results
+
+    @staticmethod
+    def _run_vector_exact(
+        view: _CorpusView,
+        query_embedding: np.ndarray,
+        fetch_k: int,
+        distance_threshold: float | None,
+        rows: np.ndarray | None,
+    ) -> list[dict]:
+        """Vector half of search() over the resident embeddings: one GEMV plus top-k.
+
+        rows (from _rows_matching) restricts the candidates like a where filter.
+        """
+        num_rows = view.num_rows
+        if view.embeddings is None or not num_rows:
+            return []
+        alive = view.alive
+        if rows is None:
+            rows = np.flatnonzero(alive) if alive is not None else None
+        elif alive is not None:
+            rows = rows[alive[rows]]
 
-        # ----- 2. BM25 search -----
+        emb = view.embeddings
+        query_vec = query_embedding[0]
+        # Both sides are L2-normalized, so the dot product is the cosine similarity.
+        sims = emb @ query_vec if rows is None else emb[rows] @ query_vec
+
+        n = min(fetch_k, len(sims))
+        if n <= 0:
+            return []
+        top = np.argpartition(-sims, n - 1)[:n]
+        top = top[np.argsort(-sims[top], kind="stable")]
+        # Same distance Chroma reports for unit vectors in "ip" and "cosine" spaces.
+        distances = (1.0 - sims[top]).tolist()
+        if rows is not None:
+            top = rows[top]
+
+        return [
+            {
+                "id": view.ids[row],
+                "document": view.texts[row],
+                "metadata": view.metas[row],
+                "distance": dist,
+            }
+            for row, dist in zip(top.tolist(), distances)
+            if distance_threshold is None or dist <= distance_threshold
+        ]
+
+    def _run_bm25(
+        self,
+        view: _CorpusView,
+        tokenized_q: list[int],
+        fetch_k: int,
+        rows: np.ndarray | None = None,
+    ) -> list[dict]:
+        """BM25 half of search() over a _CorpusView.
+
+        rows (from _rows_matching) applies search()'s where filter to the
+        BM25 candidates too, as Chroma does for the vector half.
+        """
         bm25_results: list[dict] = []
-        if self._bm25 and self._bm25_docs:
-            try:
-                tokenized_q = _tokenize(query)
-                if tokenized_q:
-                    scores = self._bm25.get_scores(tokenized_q)
-                    ranked = sorted(
-                        range(len(scores)),
-                        key=lambda i: scores[i],
-                        reverse=True,
-                    )[:fetch_k]
-                    for idx in ranked:
-                        if scores[idx] > 0:
-                            d = self._bm25_docs[idx]
-                            bm25_results.append({
-                                "document": d["document"],
-                                "metadata": d["metadata"],
-                                "distance": None,
-                            })
-            except Exception:
-                pass
+        if view.bm25 is None or not view.num_rows or not tokenized_q:
+            return bm25_results
+        try:
+            for idx, score in self._bm25_top(view, tokenized_q, fetch_k, rows):
+                if score > 0:
+                    bm25_results.append({
+                        "id": view.ids[idx],
+                        "document": view.texts[idx],
+                        "metadata": view.metas[idx],
+                        "distance": None,
+                    })
+        except Exception:
+            pass
+        return bm25_results
 
-        # ----- 3. Reciprocal Rank Fusion -----
-        RRF_K = 60
-        fusion_scores: dict[str, float] = {}
+    @staticmethod
+    def _fuse(vector_results: list[dict], bm25_results: list[dict], k: int) -> list[dict]:
+        """Merge two ranked lists with Reciprocal Rank Fusion and return the top k.
 
+        Each distinct chunk id gets an integer slot once; scores are then
+        accumulated per slot with NumPy instead of per-item dict updates.
+        Ids are short, so slot lookups no longer hash whole chunk texts.
+        """
+        slots: dict[str, int] = {}
+        merged: list[dict] = []
+
+        vec_slots = np.empty(len(vector_results), dtype=np.intp)
         for rank, item in enumerate(vector_results):
-            key = item["document"]
-            fusion_scores[key] = fusion_scores.get(key, 0) + 1.0 / (RRF_K + rank)
+            slot = slots.setdefault(item["id"], len(slots))
+            if slot == len(merged):
+                merged.append(item)
+            else:
+                # A repeated vector hit replaces the stored item but keeps its slot.
+                merged[slot] = item
+            vec_slots[rank] = slot
 
+        bm25_slots = np.empty(len(bm25_results), dtype=np.intp)
         for rank, item in enumerate(bm25_results):
-            key = item["document"]
-            fusion_scores[key] = fusion_scores.get(key, 0) + 1.0 / (RRF_K + rank)
-
-        # ----- 4. Merge and rank -----
-        merged: dict[str, dict] = {}
-        for item in vector_results:
-            merged[item["document"]] = item
-        for item in bm25_results:
-            if item["document"] not in merged:
-                merged[item["document"]] = item
-
-        ranked = sorted(
-            merged.values(),
-            key=lambda x: fusion_scores.get(x["document"], 0),
-            reverse=True,
-        )
-        return ranked[:k]
+            slot = slots.setdefault(item["id"], len(slots))
+            if slot == len(merged):
+                merged.append(item)
+            bm25_slots[rank] = slot
+
+        scores = np.zeros(len(merged))
+        np.add.at(scores, vec_slots, _rrf_weights(len(vec_slots)))
+        np.add.at(scores, bm25_slots, _rrf_weights(len(bm25_slots)))
+
+        # Find the k-th best score with an O(n) partition, keep everything at
+        # least that good (in slot order, so ties at the cut-off still go to
+        # the first-seen chunk), and sort only those.
+        if 0 < k < len(scores):
+            cutoff = np.partition(-scores, k - 1)[k - 1]
+            top = np.flatnonzero(-scores <= cutoff)
+        else:
+            top = np.arange(len(scores))
+        order = top[np.argsort(-scores[top], kind="stable")][:k]
+        return [merged[i] for i in order]
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """(1, dim) unit-norm query embedding, from the same cache search() uses."""
+        return self._embed_query(query)
+
+    def get_collection(self, name: str) -> chromadb.Collection:
+        """Another collection on this store's client, created like the main one if new."""
+        return self._client.get_or_create_collection(name=name, metadata=_COLLECTION_METADATA)
 
     def get_chunks_by_indices(
         self,
@@ -264,31 +1354,49 @@ class VectorStoreManager:
         indices: list[int],
     ) -> list[dict]:
 
-        unique_indices = sorted({i for i in indices if i is not None and i >= 0})
-        if not unique_indices:
-            return []
+        with self._lock:
+            self.flush()
+            unique_indices = sorted({i for i in indices if i is not None and i >= 0})
+            if not unique_indices:
+                return []
 
-        ids = [f"{doc_id}_{i}" for i in unique_indices]
+            ids = [f"{doc_id}_{i}" for i in unique_indices]
 
-        results = self._collection.get(ids=ids, include=["documents", "metadatas"])
+            # Another process may have written since; a changed count drops
+            # _corpus_complete so the lookup below goes to Chroma.
+            self._refresh_count()
+            if self._corpus_complete:
+                # The in-memory corpus already holds every stored chunk (kept in
+                # step on flush/delete), so answer without a Chroma round trip.
+                wanted = set(ids)
+                alive = self._doc_alive
+                return [
+                    {"document": self._doc_texts[row], "metadata": self._doc_metas[row]}
+                    for row in self._doc_rows().get(doc_id, ())
+                    if alive[row] and self._doc_ids[row] in wanted
+                ]
 
-        documents = results.get("documents") or []
-        metadatas = results.get("metadatas") or []
+            results = self._collection.get(ids=ids, include=["documents", "metadatas"])
 
-        out: list[dict] = []
-        for i, doc in enumerate(documents):
-            if doc is None:
-                continue
-            meta = metadatas[i] if i < len(metadatas) and metadatas[i] is not None else {}
-            out.append(
-                {
-                    "document": doc,
-                    "metadata": meta,
-                }
-            )
+            documents = results.get("documents") or []
+            metadatas = results.get("metadatas") or []
 
-        return out
+            return [
+                {"document": doc, "metadata": meta or {}}
+                for doc, meta in zip_longest(documents, metadatas)
+                if doc is not None
+            ]
 
     def delete(self, doc_id: str) -> None:
         """Delete all chunks belonging to a document (safe version)."""
-        self._delete_by_doc_id_prefix(doc_id)
+        with self._lock:
+            self._drop_pending({doc_id})
+            self._delete_by_doc_id_prefix(doc_id)
+
+    def delete_many(self, doc_ids: list[str]) -> None:
+        """Delete the chunks of several documents with one filtered Chroma delete."""
+        if not doc_ids:
+            return
+        with self._lock:
+            self._drop_pending(set(doc_ids))
+            self._delete_by_doc_id_prefix(*doc_ids)
@@ -1,18 +1,23 @@
 """Streamlit UI for the AI Document Q&A (RAG) system."""
 
 import os
+import shutil
 import tempfile
+import time
 import traceback
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
 import streamlit as st
 from dotenv import load_dotenv
 
 from pipeline.chunker import Chunker
+from pipeline.fingerprint import stream_sha256
 from pipeline.knowledge_base import KnowledgeBase
-from pipeline.llm_service import LLMService
+from pipeline.llm_service import HISTORY_TURNS, LLMService
 from pipeline.rag_pipeline import RAGPipeline
 from pipeline.registry import DocumentRegistry
+from pipeline.semantic_cache import SemanticCache
 from pipeline.vector_store import VectorStoreManager
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -21,14 +26,21 @@ DATA_DIR = BASE_DIR / "data"
 VECTOR_DB_DIR = BASE_DIR / "vector_db"
 DB_PATH = str(DATA_DIR / "documents.db")
 
+# Uploads are copied to disk through a buffer of this size, never read whole.
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+# Streamed answer text is handed to st.write_stream in pieces of at least this
+# many characters, or after this many seconds, instead of token by token.
+STREAM_MIN_CHARS = 32
+STREAM_MIN_INTERVAL = 0.05
+
+# Sidebar documents rendered per "Show more" step; each one is an expander + widgets.
+DOC_PAGE_SIZE = 25
 
-def get_pipeline():
-    """Initialize and cache the RAG pipeline (loaded once per session)."""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        st.error("GEMINI_API_KEY not set. Add it to your .env file.")
-        st.stop()
 
+@st.cache_resource(show_spinner=False)
+def get_pipeline(api_key: str) -> RAGPipeline:
+    """Initialize the RAG pipeline once per server process; reruns reuse it."""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     VECTOR_DB_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -37,7 +49,72 @@ def get_pipeline():
     registry = DocumentRegistry(db_path=DB_PATH)
     chunker = Chunker()
     kb = KnowledgeBase(registry=registry, vector_store=vector_store, chunker=chunker)
-    return RAGPipeline(knowledge_base=kb, llm_service=llm)
+    return RAGPipeline(
+        knowledge_base=kb,
+        llm_service=llm,
+        semantic_cache=SemanticCache(vector_store),
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _list_docs(corpus: str, _kb: KnowledgeBase) -> list[dict]:
+    """Registry listing keyed by the corpus fingerprint (_kb is not hashed).
+
+    The cache is shared by every session, and so is the fingerprint: any
+    ingest or delete, from any tab, changes the key.
+    """
+    return _kb.list_documents()
+
+
+def _current_docs(kb: KnowledgeBase) -> list[dict]:
+    return _list_docs(kb.corpus_fingerprint(), kb)
+
+
+def _coalesce(
+    tokens: Iterable[str],
+    min_chars: int = STREAM_MIN_CHARS,
+    min_interval: float = STREAM_MIN_INTERVAL,
+) -> Iterator[str]:
+    """Merge small streamed tokens so the chat message re-renders less often."""
+    buf: list[str] = []
+    size = 0
+    last = time.monotonic()
+    for token in tokens:
+        buf.append(token)
+        size += len(token)
+        now = time.monotonic()
+        if size >= min_chars or now - last >= min_interval:
+            yield "".join(buf)
+            buf.clear()
+            size = 0
+            last = now
+    if buf:
+        yield "".join(buf)
+
+
+def _preallocate(out, size: int) -> None:
+    """Reserve an upload's full size on disk before copying, instead of growing the file per write."""
+    if size > 0 and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(out.fileno(), 0, size)
+        except OSError:
+            pass  # Filesystem without fallocate support; the copy still works.
+
+
+# Button callbacks: Streamlit runs them before the script reruns, so that
+# rerun already renders the new state and no extra st.rerun() is needed.
+
+def _delete_document(kb: KnowledgeBase, doc_id: str) -> None:
+    kb.delete_document(doc_id)
+
+
+def _clear_all(kb: KnowledgeBase) -> None:
+    kb.delete_all()
+    st.session_state.notice = "Cleared. Re-upload files to ingest."
+
+
+def _show_more() -> None:
+    st.session_state.docs_shown += DOC_PAGE_SIZE
 
 
 # def main():
@@ -153,49 +230,112 @@ def get_pipeline():
 #     main()
 
 
+@st.fragment
+def _chat_panel(pipeline: RAGPipeline, docs: list[dict]) -> None:
+    """Chat history and input. Sending a message reruns only this fragment, not the sidebar."""
+    if "messages" not in st.session_state:
+        st.session_state.messages = []
+
+    for msg in st.session_state.messages:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+
+    if prompt := st.chat_input("Ask a question about your documents..."):
+        st.session_state.messages.append({"role": "user", "content": prompt})
+
+        if not docs:
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": "⚠️ Upload and ingest documents first.",
+            })
+            st.rerun(scope="fragment")
+
+        with st.chat_message("user"):
+            st.markdown(prompt)
+
+        with st.chat_message("assistant"):
+            try:
+                # Only the window the prompt uses; the full log never leaves the session.
+                history = st.session_state.messages[-(HISTORY_TURNS + 1):-1]
+                full_response = st.write_stream(
+                    _coalesce(pipeline.ask_stream(prompt, chat_history=history))
+                )
+            except Exception as e:
+                full_response = f"Error: {e}"
+                st.error(full_response)
+
+        st.session_state.messages.append({"role": "assistant", "content": full_response})
+
+
 def main():
     st.set_page_config(page_title="Document Q&A", page_icon="📄", layout="centered")
     st.title("📄 AI Document Q&A")
 
-    pipeline = get_pipeline()
-    docs = pipeline.knowledge_base.list_documents()
+    # Checked outside get_pipeline(): st.stop() must not run inside a cached function.
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        st.error("GEMINI_API_KEY not set. Add it to your .env file.")
+        st.stop()
+
+    pipeline = get_pipeline(api_key)
+    docs = _current_docs(pipeline.knowledge_base)
 
     # Sidebar: Upload & manage documents
     with st.sidebar:
         st.header("Documents")
 
-        # File upload
-        uploaded_files = st.file_uploader(
-            "Upload PDF, TXT, or MD",
-            type=["pdf", "txt", "md"],
-            accept_multiple_files=True,
-        )
-
-        # URL input (external knowledge base)
-        st.caption("Or add a URL as external knowledge")
-        url_input = st.text_input(
-            "Web page URL",
-            placeholder="https://example.com/article",
-            label_visibility="collapsed",
-        )
-        urls = [u.strip() for u in url_input.split() if u.strip().startswith(("http://", "https://"))]
-
-        if (uploaded_files or urls) and st.button("Ingest", type="primary"):
+        # Widget values are only read on submit, so typing here reruns nothing.
+        with st.form("ingest_form", clear_on_submit=False, border=False):
+            # File upload
+            uploaded_files = st.file_uploader(
+                "Upload PDF, TXT, or MD",
+                type=["pdf", "txt", "md"],
+                accept_multiple_files=True,
+            )
+
+            # URL input (external knowledge base)
+            st.caption("Or add a URL as external knowledge")
+            url_input = st.text_input(
+                "Web page URL",
+                placeholder="https://example.com/article",
+                label_visibility="collapsed",
+            )
+            submitted = st.form_submit_button("Ingest", type="primary")
+
+        # split() already strips whitespace around each token.
+        urls = [u for u in url_input.split() if u.startswith(("http://", "https://"))] if submitted else []
+
+        if submitted and not (uploaded_files or urls):
+            st.warning("Upload a file or enter a URL to ingest.")
+        elif submitted:
             items_to_ingest: list[str] = []
+            skipped: list[str] = []
             try:
                 # ✅ FIX: Save using original filename instead of temp name
                 for f in uploaded_files or []:
+                    # Same hash the knowledge base dedups on; known content is
+                    # never written to disk again.
+                    if pipeline.knowledge_base.find_duplicate(stream_sha256(f)):
+                        skipped.append(f.name)
+                        continue
                     save_path = DATA_DIR / f.name
-                    with open(save_path, "wb") as out:
-                        out.write(f.read())
+                    with open(save_path, "wb", buffering=UPLOAD_COPY_BUFFER) as out:
+                        _preallocate(out, f.size)
+                        shutil.copyfileobj(f, out, length=UPLOAD_COPY_BUFFER)
                     items_to_ingest.append(str(save_path))
 
+                if skipped:
+                    st.warning(f"Already ingested, skipped: {', '.join(skipped)}")
+
                 items_to_ingest.extend(urls)
 
-                doc_ids = pipeline.ingest(items_to_ingest)
+                if items_to_ingest:
+                    doc_ids = pipeline.ingest(items_to_ingest)
+                    st.session_state.last_ingested = doc_ids
+                    # The list below renders later in this same run; refresh it in place.
+                    docs = _current_docs(pipeline.knowledge_base)
 
-                st.success(f"Ingested {len(doc_ids)} document(s)")
-                st.rerun()
+                    st.success(f"Ingested {len(doc_ids)} document(s)")
 
             except ValueError as e:
                 st.error(str(e))
@@ -206,62 +346,40 @@ def main():
 
         st.divider()
         st.subheader("Your documents")
+        if notice := st.session_state.pop("notice", None):
+            st.success(notice)
         if not docs:
             st.caption("No documents yet. Upload files above.")
         else:
-            if st.button(
+            st.button(
                 "🗑️ Clear all & re-ingest",
                 type="secondary",
                 help="Delete all documents. Re-upload to use improved chunking.",
-            ):
-                for d in docs:
-                    pipeline.knowledge_base.delete_document(d["id"])
-                st.success("Cleared. Re-upload files to ingest.")
-                st.rerun()
+                on_click=_clear_all,
+                args=(pipeline.knowledge_base,),
+            )
 
-            for d in docs:
+            st.session_state.setdefault("docs_shown", DOC_PAGE_SIZE)
+            for d in docs[:st.session_state.docs_shown]:
                 label = d["file_name"]
                 path = d.get("file_path", "")
                 with st.expander(label, expanded=False):
                     if path.startswith(("http://", "https://")):
                         st.caption(f"[🔗 Open]({path})")
                     st.caption(f"ID: `{d['id']}`")
-                    if st.button("Delete", key=d["id"], type="secondary"):
-                        pipeline.knowledge_base.delete_document(d["id"])
-                        st.rerun()
-
-    # Main: Chat
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
-
-    if prompt := st.chat_input("Ask a question about your documents..."):
-        st.session_state.messages.append({"role": "user", "content": prompt})
-
-        if not docs:
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": "⚠️ Upload and ingest documents first.",
-            })
-            st.rerun()
-
-        with st.chat_message("user"):
-            st.markdown(prompt)
-
-        with st.chat_message("assistant"):
-            try:
-                history = st.session_state.messages[:-1]
-                full_response = st.write_stream(
-                    pipeline.ask_stream(prompt, chat_history=history)
-                )
-            except Exception as e:
-                full_response = f"Error: {e}"
-                st.error(full_response)
-
-        st.session_state.messages.append({"role": "assistant", "content": full_response})
+                    st.button(
+                        "Delete",
+                        key=d["id"],
+                        type="secondary",
+                        on_click=_delete_document,
+                        args=(pipeline.knowledge_base, d["id"]),
+                    )
+
+            hidden = len(docs) - st.session_state.docs_shown
+            if hidden > 0:
+                st.button(f"Show more ({hidden} more)", type="secondary", on_click=_show_more)
+
+    _chat_panel(pipeline, docs)
 
 
 if __name__ == "__main__":
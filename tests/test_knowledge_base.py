@@ -0,0 +1,70 @@
+"""KnowledgeBase.add_documents against a real registry and an in-memory store."""
+
+import pytest
+
+from pipeline.chunker import Chunker
+from pipeline.knowledge_base import KnowledgeBase
+from pipeline.registry import DocumentRegistry
+
+
+class _MemoryStore:
+    """Just enough of VectorStoreManager for add_documents and find_duplicate."""
+
+    def __init__(self):
+        self.chunks: dict[str, list[str]] = {}
+
+    def add(self, chunks: list[str], metadatas: list[dict]) -> None:
+        for chunk, meta in zip(chunks, metadatas):
+            self.chunks.setdefault(meta["doc_id"], []).append(chunk)
+
+    def flush(self) -> None:
+        pass
+
+    def get_chunks_by_indices(self, doc_id: str, indices: list[int]) -> list[dict]:
+        stored = self.chunks.get(doc_id, [])
+        return [{"document": stored[i], "metadata": {}} for i in indices if i < len(stored)]
+
+
+@pytest.fixture
+def kb(tmp_path):
+    registry = DocumentRegistry(db_path=str(tmp_path / "documents.db"))
+    yield KnowledgeBase(registry=registry, vector_store=_MemoryStore(), chunker=Chunker())
+    registry.close()
+
+
+def _write(tmp_path, name: str, text: str) -> str:
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_failed_load_leaves_no_registry_orphans(kb, tmp_path, monkeypatch, max_workers):
+    files = [_write(tmp_path, f"{name}.txt", f"Contents of document {name}.") for name in "abc"]
+    add_file = KnowledgeBase._add_file
+
+    def failing_add_file(self, file_path, doc_id, display_name):
+        if file_path == files[1]:
+            raise RuntimeError("load failed")
+        return add_file(self, file_path, doc_id, display_name)
+
+    monkeypatch.setattr(KnowledgeBase, "_add_file", failing_add_file)
+
+    with pytest.raises(RuntimeError, match="load failed"):
+        kb.add_documents(files, max_workers=max_workers)
+
+    docs = kb.list_documents()
+    assert [d["file_name"] for d in docs] == ["a.txt"]
+    assert set(kb.vector_store.chunks) == {docs[0]["id"]}
+
+
+def test_identical_files_in_one_batch_are_stored_once(kb, tmp_path):
+    first = _write(tmp_path, "report.txt", "Quarterly numbers went up.")
+    copy = _write(tmp_path, "report (1).txt", "Quarterly numbers went up.")
+    other = _write(tmp_path, "notes.txt", "Unrelated notes.")
+
+    doc_ids = kb.add_documents([first, copy, other])
+
+    assert doc_ids[0] == doc_ids[1] != doc_ids[2]
+    assert sorted(d["file_name"] for d in kb.list_documents()) == ["notes.txt", "report.txt"]
+    assert len(kb.vector_store.chunks[doc_ids[0]]) == 1